@@ -11,6 +11,8 @@ import requests
 import re
 from typing import Dict, Any, Optional, Union
 
+from src.utils.json_utils import extract_json_span
+
 
 class GenerationEngine:
     """
@@ -333,9 +335,9 @@ class GenerationEngine:
         text = self._clean_json_response(text)
         
         # Try to extract JSON from text (in case there's additional text before/after JSON)
-        json_match = re.search(r'(\{.*\}|\[.*\])', text, re.DOTALL)
-        if json_match:
-            text = json_match.group(0)
+        json_span = extract_json_span(text)
+        if json_span:
+            text = json_span
         
         # Fix common JSON errors
         
@@ -3,5 +3,6 @@ Utility functions and classes for the text transformation framework.
 """
 
 from .config_manager import ConfigManager
+from .json_utils import find_balanced, extract_json_span
 
-__all__ = ['ConfigManager']
+__all__ = ['ConfigManager', 'find_balanced', 'extract_json_span']
@@ -6,8 +6,18 @@ aspects of the text transformation framework.
 """
 
 import os
+import copy
 import yaml
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
+
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+
+
+# Parsed configuration files keyed by (path, mtime, size)
+_PARSE_CACHE: Dict[Tuple[str, int, int], Dict] = {}
 
 
 class ConfigManager:
@@ -27,6 +37,7 @@ class ConfigManager:
         """
         self.config_path = config_path
         self.config = {}
+        self._flat_config: Dict[str, Any] = {}
         
         # Load configuration
         self._load_config()
@@ -54,16 +65,7 @@ class ConfigManager:
         Returns:
             Configuration value
         """
-        keys = key_path.split('.')
-        value = self.config
-        
-        for key in keys:
-            if isinstance(value, dict) and key in value:
-                value = value[key]
-            else:
-                return default
-        
-        return value
+        return self._flat_config.get(key_path, default)
     
     def update_config(self, key_path: str, value: Any) -> None:
         """
@@ -84,6 +86,9 @@ class ConfigManager:
         
         # Update the value
         config[keys[-1]] = value
+        
+        # Rebuild the dotted-path index
+        self._reflatten()
     
     def save_config(self, path: str = None) -> None:
         """
@@ -94,6 +99,11 @@ class ConfigManager:
         """
         save_path = path or self.config_path
         
+        # Drop cached parses of the file being overwritten
+        abs_save_path = os.path.abspath(save_path)
+        for cache_key in [key for key in _PARSE_CACHE if key[0] == abs_save_path]:
+            del _PARSE_CACHE[cache_key]
+        
         with open(save_path, 'w') as f:
             yaml.dump(self.config, f, default_flow_style=False)
     
@@ -105,11 +115,40 @@ class ConfigManager:
             # Create default configuration if file doesn't exist
             self._create_default_config()
         
-        with open(self.config_path, 'r') as f:
-            self.config = yaml.safe_load(f)
+        stat = os.stat(self.config_path)
+        cache_key = (os.path.abspath(self.config_path), stat.st_mtime_ns, stat.st_size)
+        
+        if cache_key in _PARSE_CACHE:
+            self.config = copy.deepcopy(_PARSE_CACHE[cache_key])
+        else:
+            with open(self.config_path, 'r') as f:
+                self.config = yaml.load(f, Loader=_YamlLoader)
+            _PARSE_CACHE[cache_key] = copy.deepcopy(self.config)
         
         # Validate configuration
         self._validate_config()
+        
+        # Build the dotted-path index used by get_value
+        self._reflatten()
+    
+    def _reflatten(self) -> None:
+        """
+        Rebuild the flat index mapping every dotted key path to its value.
+        """
+        flat_config = {}
+        stack = [("", self.config)]
+        
+        while stack:
+            prefix, node = stack.pop()
+            for key, value in node.items():
+                if not isinstance(key, str):
+                    continue
+                key_path = f"{prefix}.{key}" if prefix else key
+                flat_config[key_path] = value
+                if isinstance(value, dict):
+                    stack.append((key_path, value))
+        
+        self._flat_config = flat_config
     
     def _create_default_config(self) -> None:
         """
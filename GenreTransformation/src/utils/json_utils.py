@@ -0,0 +1,73 @@
+"""
+JSON Utilities
+
+This module provides helpers for extracting JSON content from raw LLM responses.
+"""
+
+from typing import Optional
+
+
+def find_balanced(text: str, open_c: str = '{', close_c: str = '}') -> Optional[str]:
+    """
+    Extract the first balanced bracketed span from text in a single forward pass.
+
+    Brackets that appear inside double-quoted strings are ignored, so braces in
+    string values do not affect the nesting depth.
+
+    Args:
+        text: Text that may contain a JSON object or array
+        open_c: Opening bracket character
+        close_c: Closing bracket character
+
+    Returns:
+        The balanced span including both brackets, or None if none is found
+    """
+    start = text.find(open_c)
+    if start == -1:
+        return None
+
+    depth = 0
+    in_string = False
+    escaped = False
+
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == '\\':
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch == open_c:
+            depth += 1
+        elif ch == close_c:
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+
+    return None
+
+
+def extract_json_span(text: str) -> Optional[str]:
+    """
+    Extract the first balanced JSON object or array from text.
+
+    Whichever of '{' or '[' appears first determines the bracket pair to match.
+
+    Args:
+        text: Text that may contain JSON surrounded by other content
+
+    Returns:
+        The JSON span, or None if no balanced object or array is found
+    """
+    obj_start = text.find('{')
+    arr_start = text.find('[')
+
+    if arr_start != -1 and (obj_start == -1 or arr_start < obj_start):
+        return find_balanced(text, '[', ']')
+    if obj_start != -1:
+        return find_balanced(text, '{', '}')
+    return None
@@ -1,32 +1,175 @@
 import trafilatura
+import atexit
+import functools
+from html import escape
 import hashlib
+from collections import OrderedDict
 import yaml
+import requests
 import subprocess
-from bs4 import BeautifulSoup
+import threading
+import time
 import os
 import re
 import html2text
+from typing import Any, Dict, Optional, Union
 from tqdm import tqdm
-from urllib.parse import urljoin
+from urllib.parse import urljoin, urlparse
 from lxml import etree
+import lxml.html
 
 import logging
 
 logger = logging.getLogger(__name__)
 
+TIKA_APP_JAR = f"{os.path.dirname(__file__)}/tika-app-2.8.0.jar"
+TIKA_SERVER_JAR = os.environ.get(
+    "TIKA_SERVER_JAR",
+    f"{os.path.dirname(__file__)}/tika-server-standard-2.8.0.jar",
+)
+TIKA_SERVER_URL = os.environ.get("TIKA_SERVER_URL", "http://localhost:9998")
+TIKA_SERVER_STARTUP_TIMEOUT = 60
+MAX_PAGE_URLS = 10000
+MD_CACHE_SIZE = 1024
 
-def html_to_md(html: str):
-    # Create an html2text object
+_TIKA_SESSION = requests.Session()
+_TIKA_LOCK = threading.Lock()
+_tika_state: Dict[str, Any] = {"available": None, "process": None}
+
+_MD_CACHE: "OrderedDict[bytes, str]" = OrderedDict()
+_MD_CACHE_LOCK = threading.Lock()
+
+_NEWLINE_RE = re.compile(r"\n{2,}")
+# div tags, plus the openers of comments, CDATA sections and raw text elements,
+# whose content is skipped as it may hold "<div" or "</div>" that are not tags
+_DIV_SCAN_RE = re.compile(
+    rb"<(/?)div\b[^>]*>|<!--|<!\[CDATA\[|<(script|style|textarea|title|xmp)\b[^>]*>",
+    re.IGNORECASE,
+)
+_SKIPPED_SECTION_ENDS = {
+    b"<!--": re.compile(rb"-->"),
+    b"<![CDATA[": re.compile(rb"]]>"),
+}
+_URL_RE = re.compile(
+    r"([a-zA-Z0-9]{2,10}:\/\/)?[-a-zA-Z0-9@:%._\+~#=]{2,256}\.[a-z]{2,6}\b[-a-zA-Z0-9@:%_\+.~#?&//=]*"
+)
+_URL_ATTRIBUTES = ("href", "src", "action")
+_URL_ELEMENTS_XPATH = etree.XPath("//*[@href or @src or @action]")
+_UTF8_HTML_PARSER = lxml.html.HTMLParser(encoding="utf-8")
+_NON_TEXT_TAGS = ("script", "style", "template")
+_PAGE_DIVS_XPATH = etree.XPath(
+    "./div[contains(concat(' ', normalize-space(@class), ' '), ' page ')]"
+)
+_PACKAGE_ENTRY_DIVS_XPATH = etree.XPath(
+    "./div[contains(concat(' ', normalize-space(@class), ' '), ' package-entry ')]"
+)
+_PRESERVE_WHITESPACE_TAGS = ("pre", "textarea")
+_LIST_ELEMENTS_XPATH = etree.XPath("//li[not(@*)] | //ol[not(@*)]")
+_HTML_TAGS = frozenset(
+    [
+        "p",
+        "div",
+        "span",
+        "b",
+        "i",
+        "strong",
+        "em",
+        "ul",
+        "ol",
+        "li",
+        "h1",
+        "h2",
+        "h3",
+        "h4",
+        "h5",
+        "h6",
+    ]
+)
+
+
+def new_html2text() -> html2text.HTML2Text:
+    # Create an html2text object. Instances are cheap to build but keep parser
+    # state (open emphasis, list and link stacks) across handle() calls, so a
+    # converter must not be shared between documents.
     h = html2text.HTML2Text()
 
     # Ignore converting links from HTML
     h.ignore_links = True
     h.ignore_images = True
+    return h
+
 
+def html_to_md(html: str):
+    # sites serve the same article under several urls, so results are memoized by a
+    # digest of the input instead of keeping the html itself alive
+    key = hashlib.blake2b(html.encode("utf-8"), digest_size=16).digest()
+    with _MD_CACHE_LOCK:
+        md = _MD_CACHE.get(key)
+        if md is not None:
+            _MD_CACHE.move_to_end(key)
+            return md
+    h = new_html2text()
     md = h.handle(html)
+    with _MD_CACHE_LOCK:
+        _MD_CACHE[key] = md
+        if len(_MD_CACHE) > MD_CACHE_SIZE:
+            _MD_CACHE.popitem(last=False)
     return md
 
 
+@functools.lru_cache(maxsize=None)
+def _div_open_tag_re(id_: str) -> "re.Pattern[bytes]":
+    return re.compile(
+        rb"<div\b[^>]*(?<![\w-])id\s*=\s*[\"']?"
+        + re.escape(id_.encode("utf-8"))
+        + rb"(?=[\"'\s/>])[^>]*>",
+        re.IGNORECASE,
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def _raw_text_end_re(name: bytes) -> "re.Pattern[bytes]":
+    return re.compile(rb"</" + re.escape(name) + rb"\s*>", re.IGNORECASE)
+
+
+def extract_div_by_id(html: bytes, id_: str) -> Optional[bytes]:
+    """
+    Return the inner html of the first div with the given id by balancing the div tags
+    of the raw page, without building a DOM. Comments, CDATA sections and raw text
+    elements such as script and style are skipped while balancing. Returns None when
+    the div is missing or its closing tag, or the end of a skipped section, cannot be
+    found, so callers can fall back to a real parser.
+    """
+    match = _div_open_tag_re(id_).search(html)
+    if match is None:
+        return None
+    start = match.end()
+    depth = 1
+    pos = start
+    while True:
+        tag = _DIV_SCAN_RE.search(html, pos)
+        if tag is None:
+            return None
+        pos = tag.end()
+        div_close, raw_text_name = tag.groups()
+        if div_close is not None:
+            if div_close:
+                depth -= 1
+                if depth == 0:
+                    return html[start : tag.start()]
+            else:
+                depth += 1
+            continue
+        if raw_text_name is not None:
+            section_end_re = _raw_text_end_re(raw_text_name.lower())
+        else:
+            section_end_re = _SKIPPED_SECTION_ENDS[tag.group(0).upper()]
+        section_end = section_end_re.search(html, pos)
+        if section_end is None:
+            return None
+        pos = section_end.end()
+
+
 def xml_to_md(xml_string: str, heading_level: int = 1) -> str:
     """
     Convert all children of a given XML string to a single markdown string, considering their hierarchy.
@@ -36,48 +179,37 @@ def xml_to_md(xml_string: str, heading_level: int = 1) -> str:
     def get_local_tag(tag):
         return etree.QName(tag).localname
 
-    def has_textual_content(node):
+    def collect_textual_nodes(root):
         """
-        Check if the node or any of its descendants contain text.
+        Collect the nodes that contain text themselves or in any of their descendants.
         """
-        if (node.text and not node.text.isspace()) or any(
-            has_textual_content(child) for child in node.iterdescendants()
-        ):
-            return True
-        return False
+        textual_nodes = set()
+        for node in root.iter():
+            if not node.text or node.text.isspace():
+                continue
+            while node is not None and node not in textual_nodes:
+                textual_nodes.add(node)
+                node = node.getparent()
+        return textual_nodes
 
     def xml_node_to_md(node, level):
         markdown_parts = []
-        h = html2text.HTML2Text()
-        h.body_width = 0  # This will set the body width to unlimited which avoids unwanted line wraps
 
         # Get the local tag name without the namespace
         local_tag = get_local_tag(node.tag)
 
         # If the local_tag is a standard HTML tag, use html2text to convert it to Markdown.
-        if local_tag.lower() in [
-            "p",
-            "div",
-            "span",
-            "b",
-            "i",
-            "strong",
-            "em",
-            "ul",
-            "ol",
-            "li",
-            "h1",
-            "h2",
-            "h3",
-            "h4",
-            "h5",
-            "h6",
-        ]:
+        if local_tag.lower() in _HTML_TAGS:
             # Convert the entire node, including children, to a string and then to Markdown
             html_string = etree.tostring(node)
+            # a fresh converter per node, html2text keeps open tag state between
+            # handle() calls
+            h = html2text.HTML2Text()
+            # This will set the body width to unlimited which avoids unwanted line wraps
+            h.body_width = 0
             markdown_parts.append(h.handle(html_string.decode("utf-8")))
         else:
-            if has_textual_content(node):
+            if node in textual_nodes:
                 markdown_parts.append(f"{'#' * level} {local_tag}\n\n")
                 if node.text and not node.text.isspace():
                     markdown_parts.append(node.text.strip() + "\n\n")
@@ -92,70 +224,142 @@ def xml_to_md(xml_string: str, heading_level: int = 1) -> str:
 
     # Parse the XML content
     root = etree.fromstring(xml_string, None)
+    textual_nodes = collect_textual_nodes(root)
     markdown_content = xml_node_to_md(root, heading_level)
     return markdown_content.strip()
 
 
-def any_to_html(filepath: str) -> list:
+def _probe_tika_server() -> bool:
+    try:
+        return _TIKA_SESSION.get(f"{TIKA_SERVER_URL}/tika", timeout=2).ok
+    except requests.RequestException:
+        return False
+
+
+def _stop_tika_server():
+    if _tika_state["process"] is not None:
+        _tika_state["process"].terminate()
+
+
+def _ensure_tika_server() -> bool:
     """
-    @return [{'html': str, 'filename': str}]
+    Make sure a Tika server is listening on TIKA_SERVER_URL, starting one from
+    TIKA_SERVER_JAR if needed. The outcome is decided once per process.
+    """
+    with _TIKA_LOCK:
+        if _tika_state["available"] is not None:
+            return _tika_state["available"]
+        available = _probe_tika_server()
+        if not available and os.path.exists(TIKA_SERVER_JAR):
+            port = urlparse(TIKA_SERVER_URL).port or 9998
+            _tika_state["process"] = subprocess.Popen(
+                ["java", "-jar", TIKA_SERVER_JAR, "-h", "localhost", "-p", str(port)],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+            atexit.register(_stop_tika_server)
+            deadline = time.monotonic() + TIKA_SERVER_STARTUP_TIMEOUT
+            while not available and time.monotonic() < deadline:
+                if _tika_state["process"].poll() is not None:
+                    break
+                time.sleep(0.5)
+                available = _probe_tika_server()
+        if not available:
+            logger.warning("Tika server is not available, fall back to tika-app")
+        _tika_state["available"] = available
+        return available
+
+
+def tika_to_html(filepath: str) -> bytes:
     """
-    output = subprocess.check_output(
-        f"java -jar {os.path.dirname(__file__)}/tika-app-2.8.0.jar -h".split(" ")
-        + [filepath],
+    Convert a file to XHTML with the Tika server, or with a tika-app process
+    when no server can be reached.
+    """
+    if _ensure_tika_server():
+        try:
+            with open(filepath, "rb") as f:
+                response = _TIKA_SESSION.put(
+                    f"{TIKA_SERVER_URL}/tika",
+                    data=f,
+                    headers={"Accept": "text/html"},
+                    timeout=60,
+                )
+            response.raise_for_status()
+            return response.content
+        except requests.RequestException as e:
+            logger.warning(f"Tika server failed on {filepath} due to {e}")
+    return subprocess.check_output(
+        ["java", "-jar", TIKA_APP_JAR, "-h", filepath],
         timeout=60,
     )
-    soup = BeautifulSoup(output, "html.parser")
-    body = soup.find("body")
+
+
+def _inner_html(element) -> bytes:
+    """
+    Serialize the content of an element without its own tags.
+    """
+    parts = [escape(element.text, quote=False).encode("utf-8")] if element.text else []
+    for child in element:
+        parts.append(lxml.html.tostring(child, encoding="utf-8"))
+    return b"".join(parts)
+
+
+def any_to_html(filepath: str) -> list:
+    """
+    @return [{'html': str, 'filename': str}]
+    """
+    output = tika_to_html(filepath)
     results = []
-    if body == None:
+    try:
+        root = lxml.html.document_fromstring(output, parser=_UTF8_HTML_PARSER)
+    except etree.ParserError:
+        results.append({"html": b""})
+        return results
+    body = root.find("body")
+    if body is None:
         results.append(
             {
-                "html": soup.encode_contents(),
+                "html": lxml.html.tostring(root, encoding="utf-8"),
             }
         )
         return results
     # detect pdf
-    pages = body.findChildren("div", {"class": "page"}, recursive=False)  # type: ignore
+    pages = _PAGE_DIVS_XPATH(body)
     if len(pages) > 0:
-        page_cnt = 1
-        for page in pages:
-            results.append({"html": page.encode_contents(), "filename": f"{page_cnt}"})
-            page_cnt += 1
+        for page_cnt, page in enumerate(pages, start=1):
+            results.append({"html": _inner_html(page), "filename": f"{page_cnt}"})
         return results
 
     # detect archives
-    entries = body.findChildren("div", {"class": "package-entry"}, recursive=False)  # type: ignore
+    entries = _PACKAGE_ENTRY_DIVS_XPATH(body)
     if len(entries) > 0:
         for entry in entries:
-            filename_elem = entry.find("h1", recursive=False)
-            if filename_elem == None:
+            filename_elem = entry.find("h1")
+            if filename_elem is None:
                 continue
-            filename = filename_elem.text
-            filename_elem.decompose()
-            children = entry.findChildren(recursive=False)
+            filename = filename_elem.text_content()
+            filename_elem.drop_tree()
+            children = [child for child in entry if isinstance(child.tag, str)]
             if len(children) == 1:
                 results.append(
                     {
-                        "html": children[0].encode_contents(),
+                        "html": _inner_html(children[0]),
                         "filename": filename,
                     }
                 )
             else:
-                content = entry.encode_contents()
                 results.append(
                     {
-                        "html": content,
+                        "html": _inner_html(entry),
                         "filename": filename,
                     }
                 )
         return results
 
     # default
-    content = body.encode_contents()  # type: ignore
     results.append(
         {
-            "html": body.encode_contents(),  # type: ignore
+            "html": _inner_html(body),
         }
     )
     return results
@@ -165,39 +369,73 @@ def html_to_main_text(html: str):
     return trafilatura.extract(html)
 
 
-def html_to_text(raw_html):
-    raw_html = raw_html.replace("<li>", "\n*")
-    raw_html = raw_html.replace("</li>", "")
-    raw_html = raw_html.replace("<ol>", "\n*")
-    raw_html = raw_html.replace("</ol>", "")
-    soup = BeautifulSoup(raw_html, "lxml")
-    return soup.get_text()
+def html_to_text(raw_html: Union[str, bytes]):
+    if isinstance(raw_html, str):
+        raw_html = raw_html.encode("utf-8")
+    try:
+        root = lxml.html.document_fromstring(raw_html, parser=_UTF8_HTML_PARSER)
+    except etree.ParserError:
+        return ""
+    # script and style contents are not part of the text
+    etree.strip_elements(root, *_NON_TEXT_TAGS, with_tail=False)
+    # mark list items and ordered lists with a bullet on a new line
+    for element in _LIST_ELEMENTS_XPATH(root):
+        element.text = "\n*" + (element.text or "")
+    # collapse whitespace-only strings the way BeautifulSoup does
+    preserved = set()
+    for element in root.iter(*_PRESERVE_WHITESPACE_TAGS):
+        preserved.update(element.iter())
+    for element in root.iter():
+        if element not in preserved and _is_blank(element.text):
+            element.text = _collapse_blank(element.text)
+        parent = element.getparent()
+        if parent not in preserved and _is_blank(element.tail):
+            element.tail = _collapse_blank(element.tail)
+    return "".join(root.itertext())
+
+
+def _is_blank(text: Optional[str]) -> bool:
+    return bool(text) and text.isspace()
+
+
+def _collapse_blank(text: str) -> str:
+    return "\n" if "\n" in text else " "
 
 
 def filter_text(text: str):
-    newline_re = re.compile(r"\n{2,}")
-    url_re = re.compile(
-        r"([a-zA-Z0-9]{2,10}:\/\/)?[-a-zA-Z0-9@:%._\+~#=]{2,256}\.[a-z]{2,6}\b[-a-zA-Z0-9@:%_\+.~#?&//=]*"
-    )
-    text = url_re.sub("", text)
-    text = newline_re.sub("\n\n", text)
-    return text
-
-
-def html_to_urls(html: str, base_url: str, current_url: str):
-    soup = BeautifulSoup(html, "html.parser")
-    url_attributes = ["href", "src", "action"]
-    urls = []
-    for attr in url_attributes:
-        tags = soup.find_all(attrs={attr: True})
-        for tag in tags:
-            url = tag.get(attr)
+    return _NEWLINE_RE.sub("\n\n", _URL_RE.sub("", text))
+
+
+def html_to_urls(html: Union[str, bytes], base_url: str, current_url: str):
+    """
+    Collect the href, src and action urls of a page. Raw utf-8 bytes are parsed
+    directly, which saves decoding and re-encoding large pages.
+    """
+    if isinstance(html, str):
+        html = html.encode("utf-8")
+    try:
+        root = lxml.html.document_fromstring(html, parser=_UTF8_HTML_PARSER)
+    except etree.ParserError:
+        logger.info(f"Extracted 0 urls from {current_url}")
+        return []
+    # dedupe the raw attribute values first so urljoin runs once per distinct link
+    raw_urls = set()
+    for element in _URL_ELEMENTS_XPATH(root):
+        for attr in _URL_ATTRIBUTES:
+            url = element.get(attr)
             if url is not None:
-                if url.startswith("/"):
-                    url = urljoin(base_url, url)
-                elif "://" not in url:
-                    url = urljoin(current_url, url)
-                urls.append(url)
-    urls = list(set(urls))
+                raw_urls.add(url)
+        if len(raw_urls) >= MAX_PAGE_URLS:
+            logger.warning(
+                f"{current_url} links to more than {MAX_PAGE_URLS} urls, ignoring the rest"
+            )
+            break
+    urls = set()
+    for url in raw_urls:
+        if url.startswith("/"):
+            url = urljoin(base_url, url)
+        elif "://" not in url:
+            url = urljoin(current_url, url)
+        urls.add(url)
     logger.info(f"Extracted {len(urls)} urls from {current_url}")
-    return urls
+    return list(urls)
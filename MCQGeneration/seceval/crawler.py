@@ -1,23 +1,71 @@
-from typing import List
+from typing import List, Optional
 import aiohttp
 import asyncio
+import atexit
 import logging
+import random
+import queue
+import threading
 from selenium import webdriver
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import Future
 from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.remote.webdriver import WebDriver
+from selenium.webdriver.support.ui import WebDriverWait
 import time
-from selenium.common.exceptions import WebDriverException
-from pydantic import BaseModel
+from selenium.common.exceptions import (
+    InvalidArgumentException,
+    WebDriverException,
+)
+from dataclasses import dataclass
 
 logger = logging.getLogger(__name__)
 
 # Global retry count
 MAX_RETRIES = 3
+# Upper bound of the retry backoff in seconds
+MAX_BACKOFF = 8
+# Timeout of a single HTTP request in seconds
+REQUEST_TIMEOUT = 30
+# Connection pool limits of the shared HTTP session
+MAX_CONNECTIONS = 100
+MAX_CONNECTIONS_PER_HOST = 8
+
+# Errors worth retrying, other client errors such as invalid urls fail at once
+_TRANSIENT_HTTP_ERRORS = (
+    aiohttp.ClientConnectionError,
+    aiohttp.ClientPayloadError,
+    asyncio.TimeoutError,
+)
+
+# HTTP status of the current page, empty in browsers without the Navigation Timing status
+_NAVIGATION_STATUS_SCRIPT = (
+    "const entry = performance.getEntriesByType('navigation')[0];"
+    "return entry ? entry.responseStatus : null;"
+)
+
+# Pages larger than this are dropped instead of being held in memory
+MAX_PAGE_SIZE = 32 * 1024 * 1024
+READ_CHUNK_SIZE = 64 * 1024
+
+# Shared HTTP session, bound to the event loop that created it
+_SESSION: Optional[aiohttp.ClientSession] = None
+_SESSION_LOOP: Optional[asyncio.AbstractEventLoop] = None
+
+# Event loop running in a daemon thread, used by submit_crawl_url
+_BACKGROUND_LOOP: Optional[asyncio.AbstractEventLoop] = None
+_BACKGROUND_LOOP_LOCK = threading.Lock()
+
+# Idle browser drivers, reused across browser_get_page calls
+_DRIVER_POOL: "queue.Queue[WebDriver]" = queue.Queue()
+_ALL_DRIVERS: List[WebDriver] = []
+_DRIVERS_LOCK = threading.Lock()
+PAGE_LOAD_TIMEOUT = 10
 
 # PageType str class is not needed since we're going to return MIME types as strings
 
 
-class TypedContent(BaseModel):
+@dataclass(slots=True, kw_only=True)
+class TypedContent:
     mime_type: str
     content: bytes
     title: str = ""
@@ -31,82 +79,192 @@ async def http_get_page(session, url: str) -> TypedContent:
                     content_type = response.headers.get(
                         "Content-Type", "application/octet-stream"
                     )
-                    bytes_content = await response.read()  # Read as bytes
+                    bytes_content = await read_body(response, url)
+                    if bytes_content is None:
+                        return TypedContent(mime_type="text/plain", content=b"")
                     return TypedContent(
                         mime_type=content_type, content=bytes_content, title=""
                     )
+                elif is_permanent_status(response.status):
+                    logger.error(
+                        f"Failed to retrieve {url} with status {response.status}"
+                    )
+                    return TypedContent(mime_type="text/plain", content=b"")
                 else:
                     logger.warning(
                         f"Attempt {i + 1} of {url} failed with status {response.status}"
                     )
-        except aiohttp.ClientError as e:
+        except _TRANSIENT_HTTP_ERRORS as e:
             logger.warning(f"Attempt {i + 1} of {url} failed with error {e}")
-        await asyncio.sleep(i**2)  # Exponential backoff
+        except aiohttp.ClientError as e:
+            logger.error(f"Failed to retrieve {url} due to {e}")
+            return TypedContent(mime_type="text/plain", content=b"")
+        if i < MAX_RETRIES - 1:
+            await asyncio.sleep(backoff_delay(i))
     logger.error(f"Failed to retrieve {url} after {MAX_RETRIES} attempts")
     return TypedContent(mime_type="text/plain", content=b"")
 
 
-async def worker(sem, task):
-    async with sem:
-        return await task
+def is_permanent_status(status: int) -> bool:
+    """
+    Client errors will not succeed on retry, except timeouts and rate limits.
+    """
+    return 400 <= status < 500 and status not in (408, 429)
 
 
-async def do_crawl_urls(urls: List[str], max_concurrency: int) -> List[TypedContent]:
-    async with aiohttp.ClientSession() as session:
-        tasks = []
-        sem = asyncio.Semaphore(max_concurrency)
+def backoff_delay(attempt: int) -> float:
+    return min(attempt * attempt, MAX_BACKOFF) + random.uniform(0, 0.5)
 
-        for url in urls:
-            tasks.append(http_get_page(session, url))
-        results = await asyncio.gather(*(worker(sem, task) for task in tasks))
 
-        return results
+async def read_body(response, url: str) -> Optional[bytes]:
+    """
+    Read the response body in chunks, giving up once it exceeds MAX_PAGE_SIZE.
+    """
+    if (response.content_length or 0) > MAX_PAGE_SIZE:
+        logger.warning(f"Skip {url}, content length {response.content_length}")
+        return None
+    buf = bytearray()
+    async for chunk in response.content.iter_chunked(READ_CHUNK_SIZE):
+        buf.extend(chunk)
+        if len(buf) > MAX_PAGE_SIZE:
+            logger.warning(f"Skip {url}, body exceeds {MAX_PAGE_SIZE} bytes")
+            return None
+    return bytes(buf)
 
 
-def browser_get_page(url) -> TypedContent:
+async def get_shared_session() -> aiohttp.ClientSession:
+    """
+    Lazily create the process-wide session so connections, TLS sessions and DNS
+    lookups are reused across crawl calls and loaders. Callers bound their own
+    concurrency, the connector only caps the total number of connections.
+    """
+    global _SESSION, _SESSION_LOOP
+    loop = asyncio.get_running_loop()
+    if _SESSION is None or _SESSION.closed or _SESSION_LOOP is not loop:
+        connector = aiohttp.TCPConnector(
+            limit=MAX_CONNECTIONS,
+            limit_per_host=MAX_CONNECTIONS_PER_HOST,
+            ttl_dns_cache=300,
+            keepalive_timeout=60,
+        )
+        _SESSION = aiohttp.ClientSession(
+            connector=connector, timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+        )
+        _SESSION_LOOP = loop
+    return _SESSION
+
+
+@atexit.register
+def _close_session():
+    if _SESSION is None or _SESSION.closed or _SESSION_LOOP is None:
+        return
+    if _SESSION_LOOP.is_closed():
+        return
+    if _SESSION_LOOP is _BACKGROUND_LOOP and _SESSION_LOOP.is_running():
+        asyncio.run_coroutine_threadsafe(_SESSION.close(), _SESSION_LOOP).result(
+            REQUEST_TIMEOUT
+        )
+    elif not _SESSION_LOOP.is_running():
+        _SESSION_LOOP.run_until_complete(_SESSION.close())
+
+
+def _get_background_loop() -> asyncio.AbstractEventLoop:
+    global _BACKGROUND_LOOP
+    with _BACKGROUND_LOOP_LOCK:
+        if _BACKGROUND_LOOP is None or _BACKGROUND_LOOP.is_closed():
+            loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=loop.run_forever, name="crawler-loop", daemon=True
+            ).start()
+            _BACKGROUND_LOOP = loop
+        return _BACKGROUND_LOOP
+
+
+async def _http_get_page_shared(url: str) -> TypedContent:
+    session = await get_shared_session()
+    return await http_get_page(session, url)
+
+
+def submit_crawl_url(url: str) -> "Future[TypedContent]":
+    """
+    Start fetching url on the background event loop and return a future of its content,
+    so callers can keep a bounded number of pages in flight without a batch barrier.
+    """
+    return asyncio.run_coroutine_threadsafe(
+        _http_get_page_shared(url), _get_background_loop()
+    )
+
+
+def _create_driver() -> WebDriver:
     options = Options()
     options.add_argument("--disable-extensions")
     options.add_argument("--disable-gpu")
     options.add_argument("--no-sandbox")
     options.add_argument("--headless")
+    driver = webdriver.Chrome(options=options)
+    with _DRIVERS_LOCK:
+        _ALL_DRIVERS.append(driver)
+    return driver
+
+
+def _discard_driver(driver: WebDriver):
+    with _DRIVERS_LOCK:
+        if driver in _ALL_DRIVERS:
+            _ALL_DRIVERS.remove(driver)
+    try:
+        driver.quit()
+    except WebDriverException:
+        pass
+
+
+@atexit.register
+def _quit_drivers():
+    while True:
+        with _DRIVERS_LOCK:
+            if not _ALL_DRIVERS:
+                return
+            driver = _ALL_DRIVERS[-1]
+        _discard_driver(driver)
 
+
+def browser_get_page(url) -> TypedContent:
     for i in range(MAX_RETRIES):
+        driver = None
         try:
-            driver = webdriver.Chrome(options=options)
+            try:
+                driver = _DRIVER_POOL.get_nowait()
+            except queue.Empty:
+                driver = _create_driver()
             driver.get(url)
-            time.sleep(2)  # Wait for page to load, may need to be adjusted
+            WebDriverWait(driver, PAGE_LOAD_TIMEOUT).until(
+                lambda d: d.execute_script("return document.readyState") == "complete"
+            )
+            status = driver.execute_script(_NAVIGATION_STATUS_SCRIPT)
+            if status and is_permanent_status(status):
+                logger.error(f"Failed to retrieve {url} with status {status}")
+                _DRIVER_POOL.put(driver)
+                return TypedContent(mime_type="text/plain", content=b"")
             content_type = (
                 driver.execute_script("return document.contentType") or "text/html"
             )
             html_content = driver.page_source.encode("utf-8")
             title = driver.title
-            driver.quit()
+            _DRIVER_POOL.put(driver)
             return TypedContent(
                 mime_type=content_type, content=html_content, title=title
             )
+        except InvalidArgumentException as e:
+            logger.error(f"Failed to retrieve {url} due to {e}")
+            if driver is not None:
+                _DRIVER_POOL.put(driver)
+            return TypedContent(mime_type="text/plain", content=b"")
         except WebDriverException as e:
             logger.warning(f"Attempt {i + 1} of {url} failed with error {e}")
-            time.sleep(i**2)  # Exponential backoff
+            if driver is not None:
+                # the driver may be in a broken state, do not reuse it
+                _discard_driver(driver)
+        if i < MAX_RETRIES - 1:
+            time.sleep(backoff_delay(i))
 
     logger.error(f"Failed to retrieve {url} after {MAX_RETRIES} attempts")
     return TypedContent(mime_type="text/plain", content=b"")
-
-
-def browser_crawl_urls(
-    urls: List[str], max_concurrency: int = 10
-) -> List[TypedContent]:
-    logger.info(f"Crawling {len(urls)} urls with browser")
-    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
-        result = list(executor.map(browser_get_page, urls))
-    logger.info(f"Crawling with browser done")
-    return result
-
-
-def crawl_urls(urls: List[str], max_concurrency: int = 10) -> List[TypedContent]:
-    logger.info(f"Crawling {len(urls)} urls asynchronously")
-    loop = asyncio.get_event_loop()
-    result = loop.run_until_complete(
-        do_crawl_urls(urls, max_concurrency=max_concurrency)
-    )
-    logger.info(f"Asynchronous crawling done")
-    return result
@@ -1,13 +1,14 @@
-from pydantic import BaseModel
-
-from typing import Any, Dict, Optional, List
+from dataclasses import dataclass, field
+from collections import defaultdict
+from typing import Any, Dict, Iterable, Optional, List
 from uuid import uuid4
 from enum import Enum
 
 from seceval.crawler import TypedContent
 
 
-class TextArtifact(BaseModel):
+@dataclass(slots=True, kw_only=True)
+class TextArtifact:
     """
     page_id: the id of the page that contains the artifact
     page_url: the url of the artifact
@@ -37,36 +38,82 @@ class TextArtifact(BaseModel):
     text: str = ""
 
 
+def build_child_index(items: Iterable[Any]) -> Dict[Optional[str], List[Any]]:
+    """
+    Map each parent_id to its direct children, preserving the input order.
+    """
+    index: Dict[Optional[str], List[Any]] = defaultdict(list)
+    for item in items:
+        index[item.parent_id].append(item)
+    return index
+
+
+def _collect_descendant(
+    child_index: Dict[Optional[str], List[Any]], parent_id: str
+) -> List[Any]:
+    # iterative pre-order walk, children visited in their original order
+    descendant: List[Any] = []
+    stack = list(reversed(child_index.get(parent_id, [])))
+    while stack:
+        node = stack.pop()
+        descendant.append(node)
+        stack.extend(reversed(child_index.get(node.id, [])))
+    return descendant
+
+
 def find_artifact_descendant(
-    artifacts: List[TextArtifact], parent: TextArtifact
+    artifacts: List[TextArtifact],
+    parent: TextArtifact,
+    child_index: Optional[Dict[Optional[str], List[TextArtifact]]] = None,
 ) -> List[TextArtifact]:
-    children: List[TextArtifact] = []
-    for artifact in artifacts:
-        if artifact.parent_id == parent.id:
-            children.append(artifact)
-            children.extend(find_artifact_descendant(artifacts, artifact))
-    children = sorted(children, key=lambda x: x.index)
+    """
+    Get all descendants of an artifact sorted by their index in the page.
+    Pass a prebuilt child_index when calling repeatedly on the same artifacts.
+    """
+    if child_index is None:
+        child_index = build_child_index(artifacts)
+    children = _collect_descendant(child_index, parent.id)
+    children.sort(key=lambda x: x.index)
     return children
 
 
+def build_id_index(items: Iterable[Any]) -> Dict[str, Any]:
+    """
+    Map each id to its item, the first occurrence wins on duplicated ids.
+    """
+    index: Dict[str, Any] = {}
+    for item in items:
+        index.setdefault(item.id, item)
+    return index
+
+
+def _collect_hierarchy(id_index: Dict[str, Any], target: Any) -> List[Any]:
+    # walk up through parent_id until the root or a missing parent is reached
+    hierarchy = [target]
+    parent = id_index.get(target.parent_id)
+    while parent is not None:
+        hierarchy.append(parent)
+        parent = id_index.get(parent.parent_id)
+    hierarchy.reverse()
+    return hierarchy
+
+
 def get_artifact_hierarchy(
-    artifacts: List[TextArtifact], target_artifact: TextArtifact
+    artifacts: List[TextArtifact],
+    target_artifact: TextArtifact,
+    id_index: Optional[Dict[str, TextArtifact]] = None,
 ) -> List[TextArtifact]:
     """
     Get the artifact hierarchy of a specific artifact
+    Pass a prebuilt id_index when calling repeatedly on the same artifacts.
     """
-    if target_artifact.parent_id is None:
-        return [target_artifact]
-    else:
-        parent_artifact = list(
-            filter(lambda x: x.id == target_artifact.parent_id, artifacts)
-        )
-        if not parent_artifact:
-            return [target_artifact]
-        return get_artifact_hierarchy(artifacts, parent_artifact[0]) + [target_artifact]
+    if id_index is None:
+        id_index = build_id_index(artifacts)
+    return _collect_hierarchy(id_index, target_artifact)
 
 
-class PageItem(BaseModel):
+@dataclass(slots=True, kw_only=True)
+class PageItem:
     """
     id: the unique id of the page
     parent_id: the id of the parent page in the page tree
@@ -84,30 +131,34 @@ class PageItem(BaseModel):
     content: Optional[TypedContent] = None
 
 
-def find_page_descendant(pages: List[PageItem], parent: PageItem) -> List[PageItem]:
-    children: List[PageItem] = []
-    for page in pages:
-        if page.parent_id == parent.id:
-            children.append(page)
-            children.extend(find_page_descendant(pages, page))
-    children = sorted(children, key=lambda x: x.depth)
+def find_page_descendant(
+    pages: List[PageItem],
+    parent: PageItem,
+    child_index: Optional[Dict[Optional[str], List[PageItem]]] = None,
+) -> List[PageItem]:
+    """
+    Get all descendants of a page sorted by their depth.
+    Pass a prebuilt child_index when calling repeatedly on the same pages.
+    """
+    if child_index is None:
+        child_index = build_child_index(pages)
+    children = _collect_descendant(child_index, parent.id)
+    children.sort(key=lambda x: x.depth)
     return children
 
 
-def get_page_hierarchy(pages: List[PageItem], target_page: PageItem) -> List[PageItem]:
+def get_page_hierarchy(
+    pages: List[PageItem],
+    target_page: PageItem,
+    id_index: Optional[Dict[str, PageItem]] = None,
+) -> List[PageItem]:
     """
     Get the page hierarchy of a specific page
+    Pass a prebuilt id_index when calling repeatedly on the same pages.
     """
-    if target_page.parent_id is None:
-        return [target_page]
-    else:
-        try:
-            parent_page = list(filter(lambda x: x.id == target_page.parent_id, pages))[
-                0
-            ]
-            return get_page_hierarchy(pages, parent_page) + [target_page]
-        except IndexError:
-            return [target_page]
+    if id_index is None:
+        id_index = build_id_index(pages)
+    return _collect_hierarchy(id_index, target_page)
 
 
 gen_uuid = lambda: str(uuid4())
@@ -125,31 +176,36 @@ class QuestionTopic(str, Enum):
     Vulnerability = "Vulnerability"
 
 
+_TOPIC_BY_NAME: Dict[str, QuestionTopic] = {t.value: t for t in QuestionTopic}
+
+# topic that is always attached to the questions of a task
+_TASK_DEFAULT_TOPIC: Dict[str, QuestionTopic] = {
+    "cwe": QuestionTopic.Vulnerability,
+    "attck": QuestionTopic.PenTest,
+    "d3fend": QuestionTopic.PenTest,
+    "mozilla_security": QuestionTopic.WebSecurity,
+    "owasp_wstg": QuestionTopic.WebSecurity,
+    "owasg_mastg": QuestionTopic.ApplicationSecurity,
+}
+
+
 def to_question_topic(task_name: str, topics: List[str]) -> List[QuestionTopic]:
-    result = []
+    result: List[QuestionTopic] = []
+    seen = set()
     for topic_raw in topics:
-        topic_raw = topic_raw.replace(" ", "")
-        try:
-            topic = QuestionTopic(topic_raw)
+        topic = _TOPIC_BY_NAME.get(topic_raw.replace(" ", ""))
+        if topic is not None and topic not in seen:
+            seen.add(topic)
             result.append(topic)
-        except:
-            continue
-    if task_name in ["cwe"] and QuestionTopic.Vulnerability not in result:
-        result.append(QuestionTopic.Vulnerability)
-    if task_name in ["attck", "d3fend"] and QuestionTopic.PenTest not in result:
-        result.append(QuestionTopic.PenTest)
-    if (
-        task_name in ["mozilla_security", "owasp_wstg"]
-        and QuestionTopic.WebSecurity not in result
-    ):
-        result.append(QuestionTopic.WebSecurity)
-    if task_name in ["owasg_mastg"] and QuestionTopic.ApplicationSecurity not in result:
-        result.append(QuestionTopic.ApplicationSecurity)
+    default_topic = _TASK_DEFAULT_TOPIC.get(task_name)
+    if default_topic is not None and default_topic not in seen:
+        result.append(default_topic)
 
     return result
 
 
-class Question(BaseModel):
+@dataclass(slots=True, kw_only=True)
+class Question:
     id: str
     source: str
     question: str
@@ -158,5 +214,5 @@ class Question(BaseModel):
     topics: List[QuestionTopic]
     keyword: str
     text_basis: str
-    flags: Dict[str, Any] = {}
+    flags: Dict[str, Any] = field(default_factory=dict)
     redundant: bool = False
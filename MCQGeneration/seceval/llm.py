@@ -1,7 +1,13 @@
-from typing import Any, List
+from typing import Any, Coroutine, List, Optional, Tuple, TypeVar
+from langchain.cache import SQLAlchemyCache
 from langchain.schema.language_model import BaseLanguageModel
+from langchain_core.caches import RETURN_VAL_TYPE
 
+import asyncio
+from collections import OrderedDict
+import functools
 import importlib
+import threading
 from dataclasses import dataclass
 from enum import Enum
 import logging
@@ -14,17 +20,99 @@ class EndpointType(str, Enum):
     native_langchain = "native_langchain"
 
 
-def get_class_from_modules(module_list: List[str], class_name: str) -> Any:
-    for module_name in module_list:
-        try:
-            return getattr(importlib.import_module(module_name), class_name)
-        except AttributeError:
-            continue
-        except Exception as e:
-            raise e
+# per-connection settings for the LLM cache database: WAL lets readers and the
+# writer work concurrently, and a 16 MiB page cache plus a 256 MiB memory map keep
+# cache hits off the file read path
+_SQLITE_CACHE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-16384",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+)
+
+
+def _set_sqlite_cache_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    for pragma in _SQLITE_CACHE_PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+
+
+# number of LLM responses LRUSQLAlchemyCache keeps in memory
+LLM_CACHE_MEMORY_SIZE = 1024
+
+
+class LRUSQLAlchemyCache(SQLAlchemyCache):
+    """
+    SQLAlchemyCache that keeps the most recently used responses in memory, so
+    repeated prompts skip the SQL query and deserialization
+    """
+
+    def __init__(self, engine, maxsize: int = LLM_CACHE_MEMORY_SIZE):
+        super().__init__(engine)
+        self.maxsize = maxsize
+        self._recent: OrderedDict[Tuple[str, str], RETURN_VAL_TYPE] = OrderedDict()
+        # async lookups run in executor threads
+        self._lock = threading.Lock()
+
+    def _remember(self, key: Tuple[str, str], return_val: RETURN_VAL_TYPE) -> None:
+        with self._lock:
+            self._recent[key] = return_val
+            self._recent.move_to_end(key)
+            if len(self._recent) > self.maxsize:
+                self._recent.popitem(last=False)
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        key = (prompt, llm_string)
+        with self._lock:
+            return_val = self._recent.get(key)
+            if return_val is not None:
+                self._recent.move_to_end(key)
+                return list(return_val)
+        return_val = super().lookup(prompt, llm_string)
+        if return_val is not None:
+            self._remember(key, return_val)
+            return list(return_val)
+        return return_val
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        super().update(prompt, llm_string, return_val)
+        self._remember((prompt, llm_string), list(return_val))
+
+    def clear(self, **kwargs: Any) -> None:
+        super().clear(**kwargs)
+        with self._lock:
+            self._recent.clear()
+
+
+def setup_llm_cache(database_path: str) -> None:
+    """
+    Cache LLM responses in the SQLite database at database_path, with the pragmas
+    applied to every connection the cache opens and the most recently used
+    responses kept in memory.
+    """
+    from langchain.globals import set_llm_cache
+    from sqlalchemy import create_engine, event
+
+    engine = create_engine(f"sqlite:///{database_path}")
+    event.listen(engine, "connect", _set_sqlite_cache_pragmas)
+    set_llm_cache(LRUSQLAlchemyCache(engine))
+
+
+@functools.lru_cache(maxsize=128)
+def _resolve_class(module_names: Tuple[str, ...], class_name: str) -> Any:
+    for module_name in module_names:
+        ep_class = getattr(importlib.import_module(module_name), class_name, None)
+        if ep_class is not None:
+            return ep_class
     return None
 
 
+def get_class_from_modules(module_list: List[str], class_name: str) -> Any:
+    return _resolve_class(tuple(module_list), class_name)
+
+
 def setup_model_endpoint(
     endpoint_type: EndpointType,
     class_name: str,
@@ -36,10 +124,7 @@ def setup_model_endpoint(
         or endpoint_type == EndpointType.native_langchain
     ):
         if caching_on:
-            from langchain.cache import SQLiteCache
-            from langchain.globals import set_llm_cache
-
-            set_llm_cache(SQLiteCache(database_path=".langchain.db"))
+            setup_llm_cache(".langchain.db")
 
         if endpoint_type == "langchain":
             module_search_paths = [
@@ -59,3 +144,22 @@ def setup_model_endpoint(
         return ep_class(**kwargs)
     else:
         raise ValueError(f"Unknown endpoint type: {endpoint_type}")
+
+
+T = TypeVar("T")
+
+# the loop run_sync drives every LLM coroutine on
+_LLM_LOOP: Optional[asyncio.AbstractEventLoop] = None
+
+
+def run_sync(coro: Coroutine[Any, Any, T]) -> T:
+    """
+    Run a coroutine to completion from synchronous code. Every call uses the same
+    event loop, created on first use: async LLM clients keep connection pools bound
+    to the loop they first ran on, which a fresh asyncio.run loop per call would
+    close under them between generate, evaluate and postprocess steps.
+    """
+    global _LLM_LOOP
+    if _LLM_LOOP is None or _LLM_LOOP.is_closed():
+        _LLM_LOOP = asyncio.new_event_loop()
+    return _LLM_LOOP.run_until_complete(coro)
@@ -8,6 +8,8 @@ from seceval.entity import PageItem, TextArtifact
 from seceval.loader.base import LoaderBase, LoaderType
 import re
 
+_BREADCRUMB_SELECTOR = ".devsite-breadcrumb-list, nav.breadcrumbs"
+
 
 class AndroidSecLoader(WebLoader):
     task_name: str = "android_sec_doc"
@@ -20,16 +22,15 @@ class AndroidSecLoader(WebLoader):
 
     def transform_content(self, content: TypedContent, depth: int = 0) -> TypedContent:
         assert content.mime_type.startswith("text/html")
-        soup = BeautifulSoup(content.content, "html.parser")
-        article_elements = soup.find_all("article")
-
-        articles_md = []
-        for article in article_elements:
-            article_html = str(article)
-            article_md = html_to_md(article_html)
-            articles_md.append(article_md)
+        soup = BeautifulSoup(content.content, "lxml")
+        # drop the breadcrumb navigation before converting
+        for breadcrumb in soup.select(_BREADCRUMB_SELECTOR):
+            breadcrumb.decompose()
 
-        text = "\n\n".join(articles_md)
+        text = "\n\n".join(
+            html_to_md(str(article)) for article in soup.find_all("article")
+        )
+        # fallback for pages whose breadcrumb markup was not matched
         text = text.replace("  * AOSP \n  * Docs \n  * Security \n\n", "")
         content.content = text.encode()
         content.mime_type = content.mime_type.replace("text/html", "text/markdown")
@@ -39,9 +40,8 @@ class AndroidSecLoader(WebLoader):
         if url.endswith("acknowledgements"):
             return False
         if depth <= 2:
-            return (
-                url.startswith(parent_url)
-                and url[len(parent_url) :].count("/") == 1
-                and url[len(parent_url) :].count("#") == 0
-            )
+            if not url.startswith(parent_url):
+                return False
+            tail = url[len(parent_url) :]
+            return tail.count("/") == 1 and "#" not in tail
         return False
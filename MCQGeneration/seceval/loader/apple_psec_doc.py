@@ -6,11 +6,11 @@ from seceval.loader.base import LoaderBase, LoaderType
 from typing import List
 import re
 
+_PAGE_HEADER_RE = re.compile(r"\n?\d+Apple Platform Security\n*")
+
 
 def get_page_text(html: str, depth: int = 0) -> str:
-    text = html_to_text(html)
-    text = re.sub(r"\n?\d+Apple Platform Security\n*", "", text)
-    return text
+    return _PAGE_HEADER_RE.sub("", html_to_text(html))
 
 
 class ApplePSecDocLoader(FileLoader):
@@ -6,6 +6,10 @@ from seceval.entity import PageItem, TextArtifact
 from seceval.loader.base import LoaderBase, LoaderType
 import re
 
+_TACTIC_RE = re.compile(r"/tactics/TA[0-9]{4}")
+_TECHNIQUE_RE = re.compile(r"/techniques/T[0-9]{4}")
+_SUBTECH_RE = re.compile(r"/techniques/T[0-9]{4}/[0-9]{3}")
+
 
 class ATTCKLoader(WebLoader):
     task_name: str = "attck"
@@ -16,24 +20,29 @@ class ATTCKLoader(WebLoader):
     def transform_content(self, content: TypedContent, depth: int = 0) -> TypedContent:
         assert content.mime_type.startswith("text/html")
         text = html_to_md(content.content.decode())
-        patterns = [r"(?s)(# .*?)## References", r"(?s)(# .*?)×"]
-        for pattern in patterns:
-            match = re.search(pattern, text)
-            if match:
-                text = match.group(1)
-                break
+        # keep the text from the first header up to the first end marker
+        start = text.find("# ")
+        if start != -1:
+            for end_marker in ("## References", "×"):
+                end = text.find(end_marker, start + 2)
+                if end != -1:
+                    text = text[start:end]
+                    break
         content.content = text.encode()
         content.mime_type = content.mime_type.replace("text/html", "text/markdown")
         return content
 
     def filter_url(self, url: str, parent_url: str, depth: int):
+        # cheap substring checks skip most links before the regex runs
         if depth == 1:
-            return re.search(r"/tactics/TA[0-9]{4}", url)
+            return "/tactics/TA" in url and _TACTIC_RE.search(url)
         elif depth == 2:
-            match = re.search(r"/techniques/T[0-9]{4}", url)
+            if "/techniques/T" not in url:
+                return False
+            match = _TECHNIQUE_RE.search(url)
             return match and match.end() == len(url)
         elif depth == 3:
-            return re.search(r"/techniques/T[0-9]{4}/[0-9]{3}", url)
+            return "/techniques/T" in url and _SUBTECH_RE.search(url)
         else:
             return False
 
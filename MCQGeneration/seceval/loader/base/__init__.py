@@ -1,6 +1,7 @@
 from abc import ABC, abstractmethod
 from seceval.crawler import TypedContent
 from seceval.entity import PageItem, TextArtifact
+from seceval.parser import get_parser_class_by_mime
 from typing import Any, Dict, List, Tuple
 from enum import Enum
 from seceval.storage import save_artifacts
@@ -23,6 +24,19 @@ class LoaderBase:
     task_name: str
     parser_profile: Dict[str, Any] = {}
 
+    def __init__(self):
+        self._parsers: Dict[type, Any] = {}
+
+    def get_parser(self, mime_type: str):
+        """
+        Return the parser for mime_type, built once per loader from its parser_profile.
+        """
+        parser_class = get_parser_class_by_mime(mime_type)
+        parser = self._parsers.get(parser_class)
+        if parser is None:
+            parser = self._parsers[parser_class] = parser_class(self.parser_profile)
+        return parser
+
     # override in subclass
     def transform_content(self, content: TypedContent, depth: int = 0) -> TypedContent:
         return content
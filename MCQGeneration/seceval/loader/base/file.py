@@ -1,23 +1,91 @@
 from abc import ABC, abstractmethod
 from seceval.entity import PageItem, TextArtifact, gen_uuid
-from seceval.parser import get_parser_class_by_mime
 from seceval.loader.base import LoaderBase
+from seceval.parser import get_parser_class_by_mime
 from seceval.crawler import TypedContent
-from typing import Dict, List, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 from enum import Enum
-import glob
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import fnmatch
+import itertools
 import mimetypes
 import os
 import logging
 
 logger = logging.getLogger(__name__)
 
+MAX_READ_WORKERS = 16
+
+_EXT_MIME_CACHE: Dict[str, Optional[str]] = {}
+
 
 class LoaderType(str, Enum):
     WEB = "WEB"
     FILE = "FILE"
 
 
+def _scandir_recursive(
+    root: str, pattern: str, recursive: bool = False
+) -> Iterator[os.DirEntry]:
+    """
+    Yield the files under root whose name matches pattern, in the same order as glob:
+    the files of a directory first, then those of each subdirectory, depth first.
+    Hidden entries are skipped like glob does, and symlinked directories are not followed.
+    """
+    match_hidden = pattern.startswith(".")
+    try:
+        with os.scandir(root) as it:
+            entries = list(it)
+    except OSError as e:
+        logger.warning(f"Failed to scan {root}: {e}")
+        return
+    subdirs = []
+    for entry in entries:
+        if entry.name.startswith(".") and not match_hidden:
+            continue
+        if recursive and entry.is_dir(follow_symlinks=False):
+            if not entry.name.startswith("."):
+                subdirs.append(entry.path)
+        elif fnmatch.fnmatchcase(entry.name, pattern) and entry.is_file():
+            yield entry
+    for subdir in subdirs:
+        yield from _scandir_recursive(subdir, pattern, recursive)
+
+
+def _guess_mime_type(name: str) -> Optional[str]:
+    ext = os.path.splitext(name)[1]
+    try:
+        return _EXT_MIME_CACHE[ext]
+    except KeyError:
+        pass
+    mime_type = mimetypes.guess_type(name)[0]
+    # compressed names like .tar.gz are typed by their inner extension, so they
+    # are not cacheable by the last extension alone
+    if (
+        ext not in mimetypes.suffix_map
+        and ext not in mimetypes.encodings_map
+        and ext.lower() not in mimetypes.encodings_map
+    ):
+        _EXT_MIME_CACHE[ext] = mime_type
+    return mime_type
+
+
+def _parse_page(
+    parser_profile: Dict[str, Any], item: PageItem
+) -> Tuple[Optional[TypedContent], List[TextArtifact]]:
+    artifacts = get_parser_class_by_mime(item.content.mime_type)(
+        parser_profile
+    ).parse(item)
+    return item.content, artifacts
+
+
+def _read_file(file_path: str) -> bytes:
+    # unbuffered: FileIO.readall sizes its result from fstat and reads straight into it,
+    # so no read buffer is allocated per file and large files are not copied twice
+    with open(file_path, "rb", buffering=0) as f:
+        return f.readall()
+
+
 class FileLoader(LoaderBase):
     # Define instance variables with type hints
     task_type: LoaderType = LoaderType.FILE
@@ -25,29 +93,66 @@ class FileLoader(LoaderBase):
     dirname: str
     filename_pattern: str
     recursive: bool = False
+    # parse CPU-heavy files in worker processes, the parser_profile must be picklable
+    parse_in_process_pool: bool = False
 
     def create_dir_pages_recursive(
         self, dir_path: str, dir_page_items: Dict[str, PageItem]
     ):
+        """
+        Create the page items of dir_path and of its missing ancestors, top down.
+        """
         if not dir_path or dir_path in dir_page_items:
             return
-        parent_dir_path = os.path.dirname(dir_path)
-        if parent_dir_path and parent_dir_path not in dir_page_items:
-            self.create_dir_pages_recursive(parent_dir_path, dir_page_items)
-        dir_page_items[dir_path] = PageItem(
-            id=gen_uuid(),
-            parent_id=dir_page_items[os.path.dirname(dir_path)].id
-            if parent_dir_path
-            else None,
-            depth=dir_path.count("/") + 1,
-            uri=dir_path,
-            file_path=dir_path,
-            type="inode/directory",
-        )
+        parent_id = None
+        current_path = ""
+        for depth, part in enumerate(dir_path.split("/"), start=1):
+            current_path = f"{current_path}/{part}" if current_path else part
+            dir_page_item = dir_page_items.get(current_path)
+            if dir_page_item is None:
+                dir_page_item = dir_page_items[current_path] = PageItem(
+                    id=gen_uuid(),
+                    parent_id=parent_id,
+                    depth=depth,
+                    uri=current_path,
+                    file_path=current_path,
+                    type="inode/directory",
+                )
+            parent_id = dir_page_item.id
+
+    def parse_items(self, items: List[PageItem]) -> List[TextArtifact]:
+        """
+        Parse the items into artifacts, in order. With parse_in_process_pool set,
+        the files are parsed by a pool of worker processes, one per CPU.
+        """
+        artifacts: List[TextArtifact] = []
+        if self.parse_in_process_pool and len(items) > 1:
+            with ProcessPoolExecutor() as executor:
+                results = executor.map(
+                    _parse_page, itertools.repeat(self.parser_profile), items
+                )
+                for item, (content, page_artifacts) in zip(items, results):
+                    # parsers may rewrite the content, e.g. html to markdown
+                    item.content = content
+                    artifacts.extend(page_artifacts)
+        else:
+            # runs of files of one type go to the parser together, so parsers
+            # with a parse_many (PDF) can convert them concurrently
+            for mime_type, group in itertools.groupby(
+                items, key=lambda item: item.content.mime_type
+            ):
+                parser = self.get_parser(mime_type)
+                if hasattr(parser, "parse_many"):
+                    for page_artifacts in parser.parse_many(list(group)):
+                        artifacts.extend(page_artifacts)
+                else:
+                    for item in group:
+                        artifacts.extend(parser.parse(item))
+        return artifacts
 
     def load(self) -> Tuple[List[PageItem], List[TextArtifact]]:
         """
-        Scan all files by glob using dirname and filename_pattern.
+        Scan all files under dirname whose name matches filename_pattern.
         Should be implemented by subclasses to return a list of TextArtifact instances.
         """
         self.dirname = self.dirname.rstrip("/")
@@ -56,24 +161,35 @@ class FileLoader(LoaderBase):
             if self.recursive
             else os.path.join(self.dirname, self.filename_pattern)
         )
-        file_paths = glob.glob(pattern, recursive=self.recursive)
+        entries = list(
+            _scandir_recursive(self.dirname, self.filename_pattern, self.recursive)
+        )
 
-        logger.info(f"Found {len(file_paths)} files by pattern {pattern}")
+        logger.info(f"Found {len(entries)} files by pattern {pattern}")
         dir_page_items: Dict[str, PageItem] = {}
 
         page_items: List[PageItem] = []
-        artifacts: List[TextArtifact] = []
-        for file_path in file_paths:
-            mime_type = mimetypes.guess_type(file_path)[0]
+        typed_entries: List[Tuple[os.DirEntry, str]] = []
+        for entry in entries:
+            mime_type = _guess_mime_type(entry.name)
             if mime_type is None:
-                logger.warning(f"Unknown mime type for {file_path}")
+                logger.warning(f"Unknown mime type for {entry.path}")
                 continue
+            typed_entries.append((entry, mime_type))
 
-            relative_file_path = file_path[len(self.dirname) + 1 :]
-            relative_parent_dir_path = os.path.dirname(relative_file_path)
-            self.create_dir_pages_recursive(relative_parent_dir_path, dir_page_items)
-            with open(file_path, "rb") as f:
-                typed_content = TypedContent(mime_type=mime_type, content=f.read())
+        # read files concurrently to overlap disk latency; parsing stays on this thread
+        with ThreadPoolExecutor(max_workers=MAX_READ_WORKERS) as executor:
+            contents = executor.map(
+                lambda typed_entry: _read_file(typed_entry[0].path), typed_entries
+            )
+            for (entry, mime_type), content in zip(typed_entries, contents):
+                file_path = entry.path
+                relative_file_path = file_path[len(self.dirname) + 1 :]
+                relative_parent_dir_path = os.path.dirname(relative_file_path)
+                self.create_dir_pages_recursive(
+                    relative_parent_dir_path, dir_page_items
+                )
+                typed_content = TypedContent(mime_type=mime_type, content=content)
                 depth = relative_file_path.count("/") + 1
                 item = PageItem(
                     id=gen_uuid(),
@@ -88,12 +204,8 @@ class FileLoader(LoaderBase):
                 )
                 if self.filter_item(item, depth):
                     item.content = self.transform_content(typed_content, 0)
-                    artifacts.extend(
-                        get_parser_class_by_mime(typed_content.mime_type)(
-                            self.parser_profile
-                        ).parse(item)
-                    )
                     page_items.append(item)
-            page_items.extend(dir_page_items.values())
+        artifacts = self.parse_items(page_items)
+        page_items.extend(dir_page_items.values())
 
         return page_items, artifacts
@@ -1,99 +1,162 @@
-import re
-
-from pydantic import BaseModel
-from seceval.crawler import browser_crawl_urls, crawl_urls, TypedContent
+from seceval.crawler import (
+    browser_get_page,
+    submit_crawl_url,
+    TypedContent,
+)
 from seceval.convert import html_to_md, html_to_urls
 from seceval.entity import TextArtifact, gen_uuid, PageItem
 from seceval.loader.base import LoaderBase, LoaderType
-from seceval.parser import get_parser_class_by_mime
-import asyncio
-from typing import List, Optional, Tuple
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Deque, List, Optional, Set, Tuple, Union
+from urllib.parse import urlsplit, urlunsplit
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+def canonical_url(url: str) -> str:
+    """
+    Normalize a url for deduplication by dropping the fragment and lowercasing the host.
+    """
+    parts = urlsplit(url)
+    return urlunsplit((parts.scheme, parts.netloc.lower(), parts.path, parts.query, ""))
+
+
 class WebLoader(LoaderBase):
     task_type: LoaderType = LoaderType.WEB
     task_name: str
     base_url: str
     start_urls: List[str]
     max_depth: int
-    batch_size: int = 30
+    max_concurrency: int = 10
+    # pages fetched, or being fetched, ahead of the one being processed; their
+    # bodies are held in memory until their turn comes
+    max_fetched_ahead: int = 1000
     use_browser: bool = False
 
-    def extract_url(self, html: str, current_url: str, depth: int):
+    def extract_url(self, html: Union[str, bytes], current_url: str, depth: int):
         return html_to_urls(html, self.base_url, current_url)
 
     # override in subclass
     def filter_url(self, url: str, parent_url: str, depth: int):
         return True
 
-    def crawl_item(self, items: List[PageItem], depth: int, browser: bool = False):
-        loop = asyncio.get_event_loop()
-        urls = [x.uri for x in items]
-        if browser:
-            contents = browser_crawl_urls(urls, 10)
+    def set_item_content(self, item: PageItem, content: Optional[TypedContent]):
+        if content:  # Check if the content is not empty
+            item.content = content
+            item.type = content.mime_type
         else:
-            contents = crawl_urls(urls, 10)
-        for idx, content in enumerate(contents):
-            if content:  # Check if the content is not empty
-                items[idx].content = content
-                items[idx].type = content.mime_type
-            else:
-                logger.error(f"Failed to crawl item {items[idx].id}")
-                items[idx].content = TypedContent(mime_type="text/plain", content=b"")
-                items[idx].type = "error"
-        return items
+            logger.error(f"Failed to crawl item {item.id}")
+            item.content = TypedContent(mime_type="text/plain", content=b"")
+            item.type = "error"
+
+    def process_item(
+        self,
+        item: PageItem,
+        depth: int,
+        result_items: List[PageItem],
+        result_artifacts: List[TextArtifact],
+        visited: Optional[Set[str]] = None,
+    ) -> List[PageItem]:
+        """
+        Parse a crawled item into the results and return the child items to crawl next.
+        Urls whose canonical form is already in visited are skipped, and new ones are added.
+        """
+        next_items = []
+        assert item.content is not None
+        if item.type.startswith("text/html") and depth < self.max_depth:
+            # only propagate text/html
+            for url in self.extract_url(item.content.content, item.uri, depth):
+                if not self.filter_url(url, item.uri, depth):
+                    continue
+                if visited is not None:
+                    key = canonical_url(url)
+                    if key in visited:
+                        continue
+                    visited.add(key)
+                next_items.append(
+                    PageItem(
+                        id=gen_uuid(),
+                        uri=url,
+                        parent_id=item.id,
+                        depth=depth + 1,
+                    )
+                )
+
+        if self.filter_item(item, depth):
+            item.content = self.transform_content(item.content, depth)
+            result_artifacts.extend(self.get_parser(item.content.mime_type).parse(item))
+            result_items.append(item)
+        return next_items
 
     def load(self) -> Tuple[List[PageItem], List[TextArtifact]]:
+        """
+        Crawl from start_urls up to max_depth, keeping max_concurrency pages in flight.
+        Pages are fetched ahead in discovery order but processed strictly in that
+        order, so the crawl stays breadth first whichever fetch finishes first: a
+        url is claimed at its shallowest depth by its first parent, and the items
+        and artifacts come out in the same order on every run.
+        At most max_fetched_ahead pages are fetched ahead of processing, so finished
+        pages cannot pile up without bound behind a slow one.
+        Queued urls are not capped, they are small and dropping them would change
+        what is crawled.
+        """
         result_artifacts: List[TextArtifact] = []
         result_items: List[PageItem] = []
-        current_items = [
+        # urls already crawled or queued, so links repeated across pages and depths
+        # are fetched only once
+        visited = {canonical_url(url) for url in self.start_urls}
+        # items not fetched yet, in discovery order
+        queue: Deque[PageItem] = deque(
             PageItem(id=gen_uuid(), uri=url, depth=1) for url in self.start_urls
-        ]
+        )
+        # items being fetched or waiting to be processed, in discovery order
+        fetched: Deque[Tuple[PageItem, Future]] = deque()
+        running: Set[Future] = set()
 
-        for i in range(self.max_depth):
-            depth = i + 1
-            logger.info(f"Crawling {len(current_items)} items, depth {depth}")
-            for i in range(0, len(current_items), self.batch_size):
-                self.crawl_item(
-                    current_items[i : i + self.batch_size], depth, self.use_browser
-                )
+        executor = (
+            ThreadPoolExecutor(max_workers=self.max_concurrency)
+            if self.use_browser
+            else None
+        )
+        try:
+            while queue or fetched:
+                while (
+                    queue
+                    and len(running) < self.max_concurrency
+                    and len(fetched) < self.max_fetched_ahead
+                ):
+                    item = queue.popleft()
+                    if executor is not None:
+                        future = executor.submit(browser_get_page, item.uri)
+                    else:
+                        future = submit_crawl_url(item.uri)
+                    running.add(future)
+                    fetched.append((item, future))
 
-            next_items = []
-            for item in current_items:
-                assert item.content is not None
-                if item.type.startswith("text/html"):
-                    # only propagate text/html
-                    next_items.extend(
-                        map(
-                            lambda url: PageItem(
-                                id=gen_uuid(),
-                                uri=url,
-                                parent_id=item.id,
-                                depth=depth + 1,
-                            ),
-                            filter(
-                                lambda url: self.filter_url(url, item.uri, depth),
-                                self.extract_url(
-                                    item.content.content.decode("utf-8"),
-                                    item.uri,
-                                    depth,
-                                ),
-                            ),
+                _, running = wait(running, return_when=FIRST_COMPLETED)
+                # a page that finished early waits for the ones discovered before it
+                while fetched and fetched[0][1].done():
+                    item, future = fetched.popleft()
+                    try:
+                        content = future.result()
+                    except Exception as e:
+                        logger.error(f"Failed to crawl {item.uri} due to {e}")
+                        content = None
+                    self.set_item_content(item, content)
+                    queue.extend(
+                        self.process_item(
+                            item, item.depth, result_items, result_artifacts, visited
                         )
                     )
-
-                if self.filter_item(item, depth):
-                    item.content = self.transform_content(item.content, depth)
-                    result_artifacts.extend(
-                        get_parser_class_by_mime(item.content.mime_type)(
-                            self.parser_profile
-                        ).parse(item)
-                    )
-                    result_items.append(item)
-            current_items = next_items
+                logger.debug(
+                    f"{len(running)} items in flight, {len(fetched) - len(running)} "
+                    f"waiting, {len(queue)} queued"
+                )
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
 
         logger.info(f"{len(result_artifacts)} text artifacts loaded")
         return result_items, result_artifacts
@@ -1,7 +1,7 @@
 from typing import List
 
 from bs4 import BeautifulSoup
-from seceval.convert import html_to_md
+from seceval.convert import extract_div_by_id, html_to_md
 from seceval.crawler import TypedContent
 from seceval.loader.base.web import WebLoader
 from seceval.entity import PageItem, TextArtifact
@@ -20,10 +20,18 @@ class CS161Textbook(WebLoader):
 
     def transform_content(self, content: TypedContent, depth: int = 0) -> TypedContent:
         assert content.mime_type.startswith("text/html")
-        soup = BeautifulSoup(content.content, "html.parser")
-        article_element = soup.find("div", {"id": "main-content-wrap"})
-
-        text = html_to_md(str(article_element))
+        # slice the article out of the raw page, parsing the whole page only if that fails
+        article_html = extract_div_by_id(content.content, "main-content-wrap")
+        if article_html is not None:
+            text = html_to_md(article_html.decode("utf-8"))
+        else:
+            soup = BeautifulSoup(content.content, "lxml")
+            article_element = soup.find("div", {"id": "main-content-wrap"})
+            text = (
+                html_to_md(article_element.decode_contents())
+                if article_element is not None
+                else ""
+            )
         content.content = text.encode()
         content.mime_type = content.mime_type.replace("text/html", "text/markdown")
         return content
@@ -19,6 +19,7 @@ class CWELoader(FileLoader):
     # wget https://cwe.mitre.org/data/xml/views/1194.xml.zip && unzip 1194.xml.zip
     dirname = "/nfs_ml/datasets/SecEval/Vulnerability/raw/"
     filename_pattern = "*.xml"
+    parse_in_process_pool = True
     parser_profile = {
         "xpath_root": "/cwe:Weakness_Catalog/cwe:Weaknesses/cwe:Weakness",
         "namespaces": {"cwe": "http://cwe.mitre.org/cwe-7"},
@@ -6,6 +6,15 @@ from seceval.crawler import TypedContent
 from typing import List
 import re
 
+_TACTIC_RE = re.compile(r"/tactic/d3f:(\w+)")
+_TECHNIQUE_RE = re.compile(r"/technique/d3f:(\w+)")
+# the first alternative wins wherever it matches at all, since it is tried first at
+# the leftmost header and any later header that matches it also matches earlier ones
+_CONTENT_RE = re.compile(
+    r"(?P<relationships># .*?)## Digital Artifact Relationships:|(?P<close># .*?)close",
+    re.DOTALL,
+)
+
 
 class D3FENDLoader(WebLoader):
     task_name: str = "d3fend"
@@ -18,15 +27,9 @@ class D3FENDLoader(WebLoader):
         assert content.mime_type.startswith("text/html")
 
         md = html_to_md(content.content.decode("utf-8"))
-        patterns = [
-            r"(?s)(# .*?)## Digital Artifact Relationships:",
-            r"(?s)(# .*?)close",
-        ]
-        for pattern in patterns:
-            match = re.search(pattern, md)
-            if match:
-                md = match.group(1)
-                break
+        match = _CONTENT_RE.search(md)
+        if match:
+            md = match.group("relationships") or match.group("close")
         content.content = md.encode()
         content.mime_type = content.mime_type.replace("text/html", "text/markdown")
         return content
@@ -35,9 +38,9 @@ class D3FENDLoader(WebLoader):
         if url.endswith(".json"):
             return False
         if depth == 1:
-            return re.search(r"/tactic/d3f:(\w+)", url)
+            return _TACTIC_RE.search(url)
         elif depth >= 2 and depth <= 3:
-            return re.search(r"/technique/d3f:(\w+)", url) and url != parent_url
+            return _TECHNIQUE_RE.search(url) and url != parent_url
         else:
             return False
 
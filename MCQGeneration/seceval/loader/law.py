@@ -26,12 +26,12 @@ class LawLoader(WebLoader):
 
     def transform_content(self, content: TypedContent, depth: int) -> TypedContent:
         assert content.mime_type.startswith("text/html")
-        soup = BeautifulSoup(content.content, "html.parser")
+        soup = BeautifulSoup(content.content, "lxml")
         article_element = soup.find("div", {"class": "pages_content"})
         if article_element is None:
             text = html_to_main_text(content.content.decode())
         else:
-            text = html_to_md(str(article_element))
+            text = html_to_md(article_element.decode_contents())
         assert text is not None
         content.content = text.encode("utf-8")
         content.mime_type = content.mime_type.replace("text/html", "text/plain")
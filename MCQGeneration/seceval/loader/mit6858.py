@@ -4,6 +4,8 @@ from seceval.entity import PageItem
 from typing import List
 import re
 
+_LECTURE_RE = re.compile(r"/6.858/2022/lec/.*")
+
 
 class MIT6858Loader(WebLoader):
     task_name: str = "mit6.858"
@@ -13,7 +15,7 @@ class MIT6858Loader(WebLoader):
     use_browser: bool = False
 
     def filter_url(self, url: str, parent_url: str, depth: int):
-        return re.search(r"/6.858/2022/lec/.*", url) and url.endswith(".txt")
+        return _LECTURE_RE.search(url) and url.endswith(".txt")
 
     def filter_item(self, item: PageItem, depth: int = 0):
         return depth != 1
@@ -14,4 +14,5 @@ class WinSecDocLoader(FileLoader):
 
     recursive = True
     filename_pattern = "*.md"
+    parse_in_process_pool = True
     parser_profile = {}
@@ -20,6 +20,7 @@ from seceval.storage import (
     load_artifacts,
     load_evaluation,
     load_evaluation_prompt_object,
+    get_questions_progress_path,
     load_questions,
     save_artifacts,
     save_pages,
@@ -83,8 +84,12 @@ def generate(task_name: str, number: int):
     sampler = get_sampler(task_name)
     texts, backgrounds = sampler(number)  # type: ignore
     logger.info(f"Generating questions for {len(texts)} samples")
-    questions = generate_questions(prompt_object, texts, backgrounds)
+    progress_path = get_questions_progress_path(task_name)
+    questions = generate_questions(
+        prompt_object, texts, backgrounds, progress_path=progress_path
+    )
     save_questions(task_name, questions)
+    progress_path.unlink(missing_ok=True)
     questions_prompt = []
     for idx, text in enumerate(texts):
         prompt_object.text = text
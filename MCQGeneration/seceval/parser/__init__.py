@@ -5,6 +5,7 @@ from seceval.parser.md import MdParser
 from seceval.parser.pdf import PDFParser
 from seceval.parser.text import TextParser
 from seceval.parser.xml import XmlParser
+import functools
 import logging
 
 logger = logging.getLogger(__name__)
@@ -18,6 +19,7 @@ class DummyParser:
         return []
 
 
+@functools.lru_cache(maxsize=None)
 def get_parser_class_by_mime(mime_type: str):
     if mime_type.startswith("text/html"):
         return HtmlParser
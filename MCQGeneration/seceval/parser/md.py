@@ -1,5 +1,9 @@
 from seceval.entity import PageItem, TextArtifact, gen_uuid
 from typing import Any, List, Dict
+import re
+
+# leading hashes of every header line
+_HEADER_PREFIX_RE = re.compile(r"^#+", re.MULTILINE)
 
 
 class MdParser:
@@ -9,45 +13,58 @@ class MdParser:
     def parse(self, item: PageItem):
         assert item.content is not None
         md = item.content.content.decode("utf-8")
+        # the same for every artifact of the page
+        page_id = item.id
+        page_uri = item.uri or item.file_path
+        page_depth = item.depth
+        page_type = item.type
         header_stack: List[TextArtifact] = []
         artifacts: List[TextArtifact] = []
-        current_text = ""
-        minumum_level = 100
-        for line in md.split("\n"):
-            if line.startswith("#"):
-                minumum_level = min(len(line) - len(line.lstrip("#")), minumum_level)
+        header_levels = [
+            len(match.group(0)) for match in _HEADER_PREFIX_RE.finditer(md)
+        ]
+        minumum_level = min(header_levels, default=100)
+        # lines of the current artifact, joined only when it is emitted; without
+        # headers the whole page is that artifact, so its lines are not walked
+        current_text: List[str] = [] if header_levels else [md]
+        lines = md.split("\n") if header_levels else []
 
-        for line in md.split("\n"):
-            level = len(line) - len(line.lstrip("#"))
-            level = level - minumum_level + 1
+        for line in lines:
+            # only header lines need their level; 0 marks a non-header line
+            level = (
+                len(line) - len(line.lstrip("#")) - minumum_level + 1
+                if line.startswith("#")
+                else 0
+            )
 
-            if line.startswith("#") and level <= self.max_level:  # header line
-                if current_text.strip():  # if there is text for the current artifact
+            if 0 < level <= self.max_level:  # header line
+                # if there is text for the current artifact
+                if any(text_line.strip() for text_line in current_text):
                     artifact = TextArtifact(
-                        page_id=item.id,
-                        page_uri=item.uri or item.file_path,
-                        page_depth=item.depth,
-                        page_type=item.type,
+                        page_id=page_id,
+                        page_uri=page_uri,
+                        page_depth=page_depth,
+                        page_type=page_type,
                         id=header_stack[-1].id if header_stack else gen_uuid(),
                         index=len(artifacts),
                         level=header_stack[-1].level if header_stack else 1,
                         title=header_stack[-1].title if header_stack else "",
                         parent_id=header_stack[-1].parent_id if header_stack else None,
                         html="",
-                        text=current_text.strip(),
+                        text="\n".join(current_text).strip(),
                     )
                     artifacts.append(artifact)
-                    current_text = ""
+                    current_text = []
 
                 # update the stack of headers
                 while header_stack and (header_stack[-1].level) >= level:
                     header_stack.pop()
                 header_stack.append(
                     TextArtifact(
-                        page_id=item.id,
-                        page_uri=item.uri or item.file_path,
-                        page_depth=item.depth,
-                        page_type=item.type,
+                        page_id=page_id,
+                        page_uri=page_uri,
+                        page_depth=page_depth,
+                        page_type=page_type,
                         id=gen_uuid(),
                         title=line.lstrip("# ").strip(),
                         level=header_stack[-1].level + 1 if header_stack else 1,
@@ -56,24 +73,24 @@ class MdParser:
                         text="",
                     )
                 )
-                current_text += line + "\n"
+                current_text.append(line)
             else:  # non-header line
-                current_text += line + "\n"
+                current_text.append(line)
 
         # Add the last artifact
-        if current_text.strip():
+        if any(text_line.strip() for text_line in current_text):
             artifact = TextArtifact(
-                page_id=item.id,
-                page_uri=item.uri or item.file_path,
-                page_depth=item.depth,
-                page_type=item.type,
+                page_id=page_id,
+                page_uri=page_uri,
+                page_depth=page_depth,
+                page_type=page_type,
                 id=item.id if len(artifacts) == 0 else gen_uuid(),
                 level=header_stack[-1].level + 1 if header_stack else 1,
                 index=len(artifacts),
                 title=header_stack[-1].title if header_stack else "",
                 parent_id=header_stack[-1].parent_id if header_stack else None,
                 html="",
-                text=current_text.strip(),
+                text="\n".join(current_text).strip(),
             )
             artifacts.append(artifact)
 
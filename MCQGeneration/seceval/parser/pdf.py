@@ -4,21 +4,30 @@ from seceval.convert import html_to_md, any_to_html, html_to_text
 from seceval.entity import PageItem, TextArtifact, gen_uuid
 from seceval.parser.html import HtmlParser
 import os
-from seceval.loader.base import LoaderBase, PageType
 import logging
 from io import BytesIO
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from tempfile import NamedTemporaryFile
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Any, Callable, Optional
 
 logger = logging.getLogger(__name__)
 
+# PDFs converted at the same time by parse_many; the work happens in Tika, so
+# this bounds the load on the Tika server (or the number of tika-app JVMs)
+MAX_CONVERT_WORKERS = 4
+
+# a table of contents line: the title, dots or spaces, then the page number
+_TOC_LINE_RE = re.compile(r"(.+)[\s\.]+(\d+)\n")
+
 
 class TableOfContentItem(BaseModel):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
     id: str = ""
     parent_id: Optional[str] = ""
     title: str
-    page_number_range: List[int]
+    page_number_range: range
     level: int = 0
 
 
@@ -45,23 +54,23 @@ class PDFParser:
     def parse_table_of_content(self, toc_text: str, pdf_html: List[Dict[str, Any]]):
         result: List[TableOfContentItem] = []
         current_top_level_toc = None
-        toc_raw = re.findall(r"(.+)[\s\.]+(\d+)\n", toc_text)
+        toc_raw = _TOC_LINE_RE.findall(toc_text)
         toc_raw.append(("", len(pdf_html) - self.content_base_page_index))
         for idx, toc_raw_item in enumerate(toc_raw[:-1]):
             next_toc_raw_item = toc_raw[idx + 1]
             if next_toc_raw_item[1] == toc_raw_item[1]:
                 if current_top_level_toc:
-                    current_top_level_toc.page_number_range = list(
-                        range(
-                            current_top_level_toc.page_number_range[-1],
-                            int(next_toc_raw_item[1]),
-                        )
+                    current_top_level_toc.page_number_range = range(
+                        current_top_level_toc.page_number_range.start,
+                        int(next_toc_raw_item[1]),
                     )
                 result.append(
                     TableOfContentItem(
                         id=gen_uuid(),
                         title=toc_raw_item[0],
-                        page_number_range=[int(toc_raw_item[1])],
+                        page_number_range=range(
+                            int(toc_raw_item[1]), int(toc_raw_item[1]) + 1
+                        ),
                         level=1,
                     )
                 )
@@ -73,8 +82,8 @@ class PDFParser:
                 TableOfContentItem(
                     id=gen_uuid(),
                     title=toc_raw_item[0],
-                    page_number_range=list(
-                        range(int(toc_raw_item[1]), int(next_toc_raw_item[1]))
+                    page_number_range=range(
+                        int(toc_raw_item[1]), int(next_toc_raw_item[1])
                     ),
                     level=2,
                     parent_id=current_top_level_toc.id
@@ -85,29 +94,55 @@ class PDFParser:
 
         return result
 
-    def parse(self, item: PageItem):
-        result = []
-
+    def convert(self, item: PageItem) -> List[Dict[str, Any]]:
         pdf_html = any_to_html(item.file_path)
         logger.info(
             f"Converted PDF {item.file_path} to HTML"
         )  # use the name of the temporary file
+        return pdf_html
+
+    def parse(self, item: PageItem):
+        return self.parse_pdf_html(item, self.convert(item))
+
+    def parse_many(self, items: List[PageItem]) -> List[List[TextArtifact]]:
+        """
+        Parse several PDFs, converting them concurrently. Tika converts in its own
+        process, so threads are enough; the TOC assembly still runs one PDF at a time.
+        """
+        if len(items) <= 1:
+            return [self.parse(item) for item in items]
+        with ThreadPoolExecutor(
+            max_workers=min(len(items), MAX_CONVERT_WORKERS)
+        ) as executor:
+            return [
+                self.parse_pdf_html(item, pdf_html)
+                for item, pdf_html in zip(items, executor.map(self.convert, items))
+            ]
+
+    def parse_pdf_html(self, item: PageItem, pdf_html: List[Dict[str, Any]]):
+        result = []
 
         toc_text = ""
         for toc_page_number in self.toc_page_number_range:
             toc_text += html_to_text(
-                pdf_html[self.toc_base_page_index + toc_page_number - 1]["html"].decode(
-                    "utf-8"
-                )
+                pdf_html[self.toc_base_page_index + toc_page_number - 1]["html"]
             )
 
         toc_items = self.parse_table_of_content(toc_text, pdf_html)
+        page_htmls = [page["html"].decode("utf-8") for page in pdf_html]
+        page_texts: Dict[int, str] = {}
+
+        def get_cached_page_text(index: int) -> str:
+            # TOC items overlap (a chapter spans its sections' pages), so
+            # convert each page to text only the first time it is needed.
+            if index not in page_texts:
+                page_texts[index] = self.get_page_text(page_htmls[index], 0)
+            return page_texts[index]
+
         for toc_item in toc_items:
             html = "\n\n".join(
                 [
-                    pdf_html[self.content_base_page_index + x - 1]["html"].decode(
-                        "utf-8"
-                    )
+                    page_htmls[self.content_base_page_index + x - 1]
                     for x in toc_item.page_number_range
                 ]
             )
@@ -123,12 +158,7 @@ class PDFParser:
                 html=html,
                 text="\n\n".join(
                     [
-                        self.get_page_text(
-                            pdf_html[self.content_base_page_index + x - 1][
-                                "html"
-                            ].decode("utf-8"),
-                            0,
-                        )
+                        get_cached_page_text(self.content_base_page_index + x - 1)
                         for x in toc_item.page_number_range
                     ]
                 ),
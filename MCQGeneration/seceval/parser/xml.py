@@ -2,6 +2,7 @@ from lxml import etree
 from typing import Any, Callable, Dict, List, Optional, Set
 from seceval.convert import xml_to_md
 import re
+import sys
 
 # Assuming these are defined elsewhere in your codebase.
 from seceval.entity import PageItem, TextArtifact, gen_uuid
@@ -10,6 +11,18 @@ import logging
 logger = logging.getLogger(__name__)
 
 
+def _local_name(tag: str) -> str:
+    # same as etree.QName(tag).localname without building a QName, interned
+    # because the same few tag names title most artifacts of a document
+    return sys.intern(tag.rsplit("}", 1)[-1])
+
+
+def _direct_text(node: etree.ElementBase) -> str:
+    # the node's own text() nodes: its leading text plus the tail of every
+    # child (comments included), without evaluating an XPath per node
+    return "".join([node.text or ""] + [child.tail or "" for child in node])
+
+
 class XmlParser:
     get_element_title: Callable[[etree.ElementBase, int], str]
 
@@ -19,7 +32,7 @@ class XmlParser:
         self.xpath_root = profile.get("xpath_root", "/")
         self.namespaces = profile.get("namespaces", {})
         self.get_element_title = profile.get(
-            "get_element_title", lambda node, level: etree.QName(node.tag).localname
+            "get_element_title", lambda node, level: _local_name(node.tag)
         )
 
     def parse(self, item: PageItem) -> List[TextArtifact]:
@@ -36,15 +49,22 @@ class XmlParser:
             f"Found {len(starting_nodes)} starting nodes from XPath {xpath_root} and namespaces {self.namespaces}"
         )
 
+        # the same for every artifact of the page
+        page_id = item.id
+        page_uri = item.uri or item.file_path
+        page_depth = item.depth
+        page_type = item.type
         # List to hold the text artifacts
         artifacts: List[TextArtifact] = []
 
-        # Function to recursively parse the XML
-        def parse_node(node: etree.ElementBase, level, parent_id):
-            local_tag = etree.QName(node.tag).localname
+        # Walk the tree depth first with an explicit stack, in document order
+        stack = [(node, 1, None) for node in reversed(starting_nodes)]
+        while stack:
+            node, level, parent_id = stack.pop()
+            local_tag = _local_name(node.tag)
             # Check if node name is in the valid names set, if provided
             if self.node_names is not None and local_tag not in self.node_names:
-                return
+                continue
             if level > self.max_level:
                 # Convert all child nodes to a single markdown string
                 try:
@@ -54,10 +74,10 @@ class XmlParser:
                     markdown_content = ""
 
                 artifact = TextArtifact(
-                    page_id=item.id,
-                    page_uri=item.uri or item.file_path,
-                    page_depth=item.depth,
-                    page_type=item.type,
+                    page_id=page_id,
+                    page_uri=page_uri,
+                    page_depth=page_depth,
+                    page_type=page_type,
                     id=gen_uuid(),
                     index=len(artifacts),
                     title=self.get_element_title(node, level),
@@ -67,15 +87,15 @@ class XmlParser:
                     text=markdown_content,
                 )
                 artifacts.append(artifact)
-                return
+                continue
 
             # Create a TextArtifact for the current node
-            text_content = ("".join(node.xpath("text()"))).strip()
+            text_content = _direct_text(node).strip()
             artifact = TextArtifact(
-                page_id=item.id,
-                page_uri=item.uri or item.file_path,
-                page_depth=item.depth,
-                page_type=item.type,
+                page_id=page_id,
+                page_uri=page_uri,
+                page_depth=page_depth,
+                page_type=page_type,
                 id=gen_uuid(),
                 index=len(artifacts),
                 title=self.get_element_title(node, level),
@@ -86,13 +106,12 @@ class XmlParser:
             )
             artifacts.append(artifact)
 
-            # Parse child nodes
-            for child in node.getchildren():
-                parse_node(child, level + 1, artifact.id)
+            # Queue the child elements so the first child is parsed next
+            stack.extend(
+                (child, level + 1, artifact.id)
+                for child in node.iterchildren(etree.Element, reversed=True)
+            )
 
-        # Parse starting from each node found by the XPath root
-        for node in starting_nodes:
-            parse_node(node, 1, None)
         logger.info(f"Parsed {len(artifacts)} text artifacts")
 
         return artifacts
@@ -1,7 +1,9 @@
-from typing import Dict, List
+from typing import Dict, List, Optional
 import os
 from seceval.entity import Question, QuestionTopic
+from seceval.llm import run_sync
 from seceval.question.generate import batch_chat_completion
+from langchain_core.language_models import LanguageModelInput
 import re
 from langchain.schema.messages import (
     AIMessage,
@@ -10,20 +12,28 @@ from langchain.schema.messages import (
     SystemMessage,
 )
 import json
-from hashlib import sha256
-import asyncio
+import itertools
+from collections import defaultdict
 import logging
 
 logger = logging.getLogger(__name__)
 
+_ANSWER_LETTER_RE = re.compile(r"[A-D]")
+# markdown code fences the LLM may wrap its json answer in
+_CODE_FENCE_RE = re.compile(r"```(?:json)?")
+
 
 def group_questions_by_topics(questions: List[Question]):
     """
     group questions by topics
     """
+    questions_by_topic: Dict[QuestionTopic, List[Question]] = defaultdict(list)
+    for question in questions:
+        # a question listing a topic twice still belongs to its group once
+        for topic in dict.fromkeys(question.topics):
+            questions_by_topic[topic].append(question)
     for topic in QuestionTopic.__members__.values():
-        questions_of_topic = list(filter(lambda x: topic in x.topics, questions))
-        yield topic, questions_of_topic
+        yield topic, questions_by_topic.get(topic, [])
 
 
 def chunks(lst, n):
@@ -31,9 +41,23 @@ def chunks(lst, n):
         yield lst[i : i + n]
 
 
+async def gather_batches(
+    batches: List[List[LanguageModelInput]], temperature: Optional[float] = None
+) -> List[List[AIMessage]]:
+    """
+    run all batches through batch_chat_completion at once, which sends them
+    concurrently, and split the outputs back into the batches
+    """
+    outputs = await batch_chat_completion(
+        [model_input for batch in batches for model_input in batch],
+        temperature=temperature,
+    )
+    offsets = list(itertools.accumulate(len(batch) for batch in batches))
+    return [outputs[start:end] for start, end in zip([0] + offsets[:-1], offsets)]
+
+
 def serialize_questions(question: Question):
-    question_text = "Question: " + question.question + " ".join(question.choices)
-    return question_text
+    return f"Question: {question.question}{' '.join(question.choices)}"
 
 
 def calibrate_answer(all_questions: List[Question]):
@@ -54,19 +78,20 @@ Response Format:
 """
     questions_by_text_basis: Dict[str, List[Question]] = {}
     # group questions by text_basis
+    # the text itself is the key: str caches its hash, so there is nothing
+    # to gain from digesting it first
     for question in all_questions:
-        text_basis_key = sha256(question.text_basis.encode("utf-8")).hexdigest()
-        if text_basis_key not in questions_by_text_basis:
-            questions_by_text_basis[text_basis_key] = []
+        if question.text_basis not in questions_by_text_basis:
+            questions_by_text_basis[question.text_basis] = []
         if not question.flags.get("invalid"):
-            questions_by_text_basis[text_basis_key].append(question)
+            questions_by_text_basis[question.text_basis].append(question)
     questions_list = []
     for questions in questions_by_text_basis.values():
         questions_list.append(list(questions))
 
-    loop = asyncio.get_event_loop()
-
-    for questions_list_batch in list(chunks(questions_list, 10)):
+    questions_list_batches = list(chunks(questions_list, 10))
+    llm_input_batches = []
+    for questions_list_batch in questions_list_batches:
         llm_inputs = []
         for questions in questions_list_batch:
             text_basis = questions[0].text_basis
@@ -80,40 +105,39 @@ Response Format:
                     HumanMessage(content=questions),
                 ]
             )
-        llm_outputs: List[AIMessage] = loop.run_until_complete(
-            batch_chat_completion(llm_inputs)
-        )
+        llm_input_batches.append(llm_inputs)
+    llm_output_batches: List[List[AIMessage]] = run_sync(
+        gather_batches(llm_input_batches)
+    )
+
+    for questions_list_batch, llm_outputs in zip(
+        questions_list_batches, llm_output_batches
+    ):
         for idx, llm_output in enumerate(llm_outputs):
             try:
-                llm_output_str = llm_output.content.replace("```json", "")
-                llm_output_str = llm_output_str.replace("```", "")
+                llm_output_str = _CODE_FENCE_RE.sub("", llm_output.content)
                 answers_list = json.loads(llm_output_str)
             except Exception as e:
                 print(f"error in parsing json string: {llm_output_str} due to {e}")
                 continue
             for j, answer in enumerate(answers_list):
                 calibrated_answer = "".join(
-                    sorted(re.findall(r"[A-D]", answer["answer"]))
+                    sorted(_ANSWER_LETTER_RE.findall(answer["answer"]))
                 )
-                original_answer = questions_list_batch[idx][j].answer
+                question = questions_list_batch[idx][j]
+                original_answer = question.answer
                 if calibrated_answer != original_answer:
-                    questions_list[idx][j].flags.update({"calibrated": True})
-                    questions_list[idx][j].flags.update(
-                        {"calibrated_answer": calibrated_answer}
-                    )
-                    questions_list[idx][j].flags.update(
-                        {"orignial_answer": questions_list[idx][j].answer}
-                    )
-                    questions_list[idx][j].flags.update(
+                    question.flags.update({"calibrated": True})
+                    question.flags.update({"calibrated_answer": calibrated_answer})
+                    question.flags.update({"orignial_answer": question.answer})
+                    question.flags.update(
                         {"calibrated_citation": answer["answer_citations"]}
                     )
-                    questions_list[idx][j].flags.update(
-                        {"calibration_output": answer["answer"]}
-                    )
+                    question.flags.update({"calibration_output": answer["answer"]})
                     logger.info(
-                        f'calibrated answer for question {questions_list[idx][j].question} from {original_answer} to {calibrated_answer} due to {answer["answer_citations"]}'
+                        f'calibrated answer for question {question.question} from {original_answer} to {calibrated_answer} due to {answer["answer_citations"]}'
                     )
-                    questions_list[idx][j].answer = calibrated_answer
+                    question.answer = calibrated_answer
     return all_questions
 
 
@@ -132,48 +156,48 @@ def fixup_invalid_questions(questions: List[Question]):
         "correct_answers": "/*Provide the revised answer(s) as a regex pattern [ABCD]+ representing valid choices.*/",
     }
 """
-    loop = asyncio.get_event_loop()
-
-    invalid_questions = list(filter(lambda x: x.flags.get("invalid"), questions))
-    for question_batch in chunks(invalid_questions, 10):
-        llm_inputs = []
-        for question in question_batch:
-            llm_inputs.append(
-                [
-                    SystemMessage(
-                        content=system_prompt_template.format(
-                            text_basis=question.text_basis,
-                            reason=question.flags.get("invalid_reason"),
-                        )
-                        + output_format
-                    ),
-                    HumanMessage(content=serialize_questions(question)),
-                ]
-            )
-            llm_outputs: List[AIMessage] = loop.run_until_complete(
-                batch_chat_completion(llm_inputs)
-            )
-            for idx, llm_output in enumerate(llm_outputs):
-                try:
-                    llm_output_str = llm_output.content.replace("```json", "")
-                    llm_output_str = llm_output_str.replace("```", "")
-                    revised_question = json.loads(llm_output_str)
-
-                    question_batch[idx].flags.update(
-                        {"old_question": question_batch[idx].question}
+    invalid_questions = [x for x in questions if x.flags.get("invalid")]
+    question_batches = list(chunks(invalid_questions, 10))
+    llm_input_batches = [
+        [
+            [
+                SystemMessage(
+                    content=system_prompt_template.format(
+                        text_basis=question.text_basis,
+                        reason=question.flags.get("invalid_reason"),
                     )
-                    question_batch[idx].flags.update(
-                        {"old_choices": question_batch[idx].choices}
-                    )
-                    question_batch[idx].flags.update({"invalid": False})
-                    question_batch[idx].flags.update(
-                        {"optimize_strategy": revised_question["optimize_strategy"]}
-                    )
-                    question_batch[idx].choices = revised_question["choices"]
-                    question_batch[idx].question = revised_question["question"]
-                except Exception as e:
-                    print(f"error in parsing json string: {llm_output_str} due to {e}")
-                    continue
+                    + output_format
+                ),
+                HumanMessage(content=serialize_questions(question)),
+            ]
+            for question in question_batch
+        ]
+        for question_batch in question_batches
+    ]
+    llm_output_batches: List[List[AIMessage]] = run_sync(
+        gather_batches(llm_input_batches)
+    )
+    for question_batch, llm_outputs in zip(question_batches, llm_output_batches):
+        for idx, llm_output in enumerate(llm_outputs):
+            try:
+                llm_output_str = _CODE_FENCE_RE.sub("", llm_output.content)
+                revised_question = json.loads(llm_output_str)
+
+                question_batch[idx].flags.update(
+                    {"old_question": question_batch[idx].question}
+                )
+                question_batch[idx].flags.update(
+                    {"old_choices": question_batch[idx].choices}
+                )
+                question_batch[idx].flags.update({"invalid": False})
+                question_batch[idx].flags.update(
+                    {"optimize_strategy": revised_question["optimize_strategy"]}
+                )
+                question_batch[idx].choices = revised_question["choices"]
+                question_batch[idx].question = revised_question["question"]
+            except Exception as e:
+                print(f"error in parsing json string: {llm_output_str} due to {e}")
+                continue
     return questions
 
 
@@ -198,17 +222,18 @@ def filter_invalid_questions(questions: List[Question]):
             content='{"self-contained":"The question is not self contained due to lake the describe text refered in the question stem","answer": "Invalid"}'
         ),
     ]
-    loop = asyncio.get_event_loop()
-    for question_batch in chunks(questions, 10):
-        llm_inputs = []
-        for question in question_batch:
-            llm_input = chat_few_shot + [
-                HumanMessage(content=serialize_questions(question))
-            ]
-            llm_inputs.append(llm_input)
-        llm_outputs: List[AIMessage] = loop.run_until_complete(
-            batch_chat_completion(llm_inputs, temperature=0.1)
-        )
+    question_batches = list(chunks(questions, 10))
+    llm_input_batches = [
+        [
+            chat_few_shot + [HumanMessage(content=serialize_questions(question))]
+            for question in question_batch
+        ]
+        for question_batch in question_batches
+    ]
+    llm_output_batches: List[List[AIMessage]] = run_sync(
+        gather_batches(llm_input_batches, temperature=0.1)
+    )
+    for question_batch, llm_outputs in zip(question_batches, llm_output_batches):
         for idx, llm_output in enumerate(llm_outputs):
             try:
                 llm_output_dict = json.loads(llm_output.content)
@@ -1,45 +1,53 @@
+import re
 from typing import List
 from seceval.question.artifact_sampler.default import do_sample_artifacts
 
 from seceval.storage import load_artifacts, load_pages
 
+CWE_TOP25 = frozenset(
+    [
+        "269",
+        "918",
+        "276",
+        "362",
+        "77",
+        "306",
+        "89",
+        "190",
+        "22",
+        "416",
+        "476",
+        "94",
+        "20",
+        "125",
+        "434",
+        "798",
+        "862",
+        "119",
+        "863",
+        "502",
+        "78",
+        "352",
+        "287",
+        "787",
+        "79",
+    ]
+)
+_CWE_TITLE_RE = re.compile(r"CWE (\d+):")
+
+
+def is_top25_title(title: str) -> bool:
+    match = _CWE_TITLE_RE.match(title)
+    return match is not None and match.group(1) in CWE_TOP25
+
 
 def artifact_sampler(number: int):
     task_name = "cwe"
-    cwe_top25 = [
-        "CWE 269:",
-        "CWE 918:",
-        "CWE 276:",
-        "CWE 362:",
-        "CWE 77:",
-        "CWE 306:",
-        "CWE 89:",
-        "CWE 190:",
-        "CWE 22:",
-        "CWE 416:",
-        "CWE 476:",
-        "CWE 94:",
-        "CWE 20:",
-        "CWE 125:",
-        "CWE 434:",
-        "CWE 798:",
-        "CWE 862:",
-        "CWE 119:",
-        "CWE 863:",
-        "CWE 502:",
-        "CWE 78:",
-        "CWE 352:",
-        "CWE 287:",
-        "CWE 787:",
-        "CWE 79:",
-    ]
     artifacts = load_artifacts(task_name)
     pages = load_pages(task_name)
 
     top25_texts, top25_backgrounds = do_sample_artifacts(
-        lambda x: bool(
-            x.level == 1 and x.page_depth == 1 and x.title.startswith(tuple(cwe_top25))
-        ),
+        lambda x: bool(x.level == 1 and x.page_depth == 1 and is_top25_title(x.title)),
         artifacts,
         pages,
         min(number, 25),
@@ -47,9 +55,7 @@ def artifact_sampler(number: int):
     if number > 25:
         texts, backgrounds = do_sample_artifacts(
             lambda x: bool(
-                x.level == 1
-                and x.page_depth == 1
-                and not x.title.startswith(tuple(cwe_top25))
+                x.level == 1 and x.page_depth == 1 and not is_top25_title(x.title)
             ),
             artifacts,
             pages,
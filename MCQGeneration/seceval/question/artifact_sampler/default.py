@@ -1,9 +1,11 @@
 import random
-from typing import Callable, List
+from typing import Callable, Dict, List
 import re
 from seceval.entity import (
     PageItem,
     TextArtifact,
+    build_child_index,
+    build_id_index,
     find_artifact_descendant,
     get_artifact_hierarchy,
     find_page_descendant,
@@ -37,29 +39,47 @@ def do_sample_artifacts(
 
     backgrounds = []
     texts = []
+    artifact_child_index = build_child_index(artifacts)
+    artifact_id_index = build_id_index(artifacts)
+    page_id_index = build_id_index(pages)
+    page_hierarchy_texts: Dict[str, str] = {}
+    parent_hierarchy_texts: Dict[str, str] = {}
     for sample in samples:
-        decendant = find_artifact_descendant(artifacts, sample)
-        artifact_hierarchy = get_artifact_hierarchy(artifacts, sample)
-        for page in pages:
-            if page.id == sample.page_id:
-                sample_page = page
-                break
-        sample_page = list(filter(lambda x: x.id == sample.page_id, pages))[0]
-        page_hierarchy = get_page_hierarchy(pages, sample_page)
-        page_hierarchy_text = "->".join([page.uri for page in page_hierarchy])
-        artifact_hierarchy_text = "->".join(
-            [artifact.title for artifact in artifact_hierarchy]
-        )
+        decendant = find_artifact_descendant(artifacts, sample, artifact_child_index)
+        # many samples come from the same page, build its hierarchy text once
+        page_hierarchy_text = page_hierarchy_texts.get(sample.page_id)
+        if page_hierarchy_text is None:
+            sample_page = page_id_index[sample.page_id]
+            page_hierarchy = get_page_hierarchy(pages, sample_page, page_id_index)
+            page_hierarchy_text = "->".join([page.uri for page in page_hierarchy])
+            page_hierarchy_texts[sample.page_id] = page_hierarchy_text
+        # siblings share everything above themselves, build each parent's part once
+        parent_hierarchy_text = None
+        if sample.parent_id in artifact_id_index:
+            parent_hierarchy_text = parent_hierarchy_texts.get(sample.parent_id)
+            if parent_hierarchy_text is None:
+                parent_hierarchy = get_artifact_hierarchy(
+                    artifacts, artifact_id_index[sample.parent_id], artifact_id_index
+                )
+                parent_hierarchy_text = "->".join(
+                    [artifact.title for artifact in parent_hierarchy]
+                )
+                parent_hierarchy_texts[sample.parent_id] = parent_hierarchy_text
+        if parent_hierarchy_text is None:
+            artifact_hierarchy_text = sample.title
+        else:
+            artifact_hierarchy_text = parent_hierarchy_text + "->" + sample.title
         decendant_text = "\n".join([artifact.text for artifact in decendant])
-        text = artifact_hierarchy_text + "\n" + sample.text + "\n" + decendant_text
+        text = "\n".join([artifact_hierarchy_text, sample.text, decendant_text])
 
         # segment the decendant_text into 8192 characters per segment
         segment_length = 8192
-        for i in range(0, len(text), segment_length):
-            segment = text[i : i + segment_length]
-            if len(segment) < 4096 and i != 0:
+        text_length = len(text)
+        for i in range(0, text_length, segment_length):
+            # only the last segment can be short, drop it before slicing
+            if text_length - i < 4096 and i != 0:
                 continue
-            texts.append(segment)
+            texts.append(text[i : i + segment_length])
             background = f"These texts were extracted from the web page {sample.page_uri}, following a fixed order determined by the page hierarchy: {page_hierarchy_text}\n semgent {i//segment_length}"
             if sample.level > 1:
                 backgrounds.append(background)
@@ -1,6 +1,6 @@
-from copy import deepcopy
 import json
-from seceval.llm import setup_model_endpoint, EndpointType
+import orjson
+from seceval.llm import setup_model_endpoint, setup_llm_cache, EndpointType, run_sync
 from langchain_core.language_models import LanguageModelInput
 import re
 from langchain.schema.messages import (
@@ -10,24 +10,29 @@ from langchain.schema.messages import (
 import os
 import asyncio
 import logging
-from typing import Any, Dict, List, Optional
+from collections import defaultdict
+from contextlib import nullcontext
+from typing import Any, AsyncIterator, Dict, Hashable, List, Optional, Tuple
 
 from seceval.question.prompt import QuestionGenerationPrompt, QuestionEvaluationPrompt
-from langchain.globals import set_llm_cache
-from langchain.cache import SQLiteCache
 from pathlib import Path
 
-from langchain.globals import set_llm_cache
-
-set_llm_cache(
-    SQLiteCache(
-        database_path=str(Path(__file__).parent.parent.parent / ".langchain.db")
-    )
-)
+setup_llm_cache(str(Path(__file__).parent.parent.parent / ".langchain.db"))
 
 
 logger = logging.getLogger(__name__)
 
+# markdown code fences around, or inside, the json the LLM answers with
+_CODE_FENCE_RE = re.compile(r"```(?:json\n)?")
+
+# question fields sent to the LLM for evaluation
+_EVALUATED_QUESTION_KEYS = frozenset(
+    ["question_description", "choices", "correct_answers"]
+)
+
+# number of chat completion requests in flight at the same time
+MAX_CONCURRENT_REQUESTS = 32
+
 api_key = os.environ["OPENAI_API_KEY"]
 api_endpoint = os.environ["OPENAI_API_ENDPOINT"]
 api_type = os.environ.get("OPENAI_API_TYPE", "azure")
@@ -49,91 +54,200 @@ llm = setup_model_endpoint(
 )
 
 
+def _loads_llm_json(json_string: str) -> Any:
+    try:
+        return orjson.loads(json_string)
+    except orjson.JSONDecodeError:
+        # orjson is strict, LLMs often put raw newlines inside strings
+        return json.loads(json_string, strict=False)
+
+
 def ai_message_to_json(ai_message: AIMessage):
     assert type(ai_message.content) == str
-    json_string = ai_message.content.replace("```json\n", "")
-    json_string = json_string.replace("```", "")
+    json_string = _CODE_FENCE_RE.sub("", ai_message.content)
     try:
-        json_object = json.loads(json_string, strict=False)
+        json_object = _loads_llm_json(json_string)
     except Exception as e:
         logger.error(f"error in parsing json string: {json_string} due to f{e}")
         json_object = [{"text": json_string, "error": str(e)}]
     return json_object
 
 
+def _model_input_key(model_input: LanguageModelInput) -> Hashable:
+    if isinstance(model_input, list) and all(
+        isinstance(message, BaseMessage) and isinstance(message.content, str)
+        for message in model_input
+    ):
+        return tuple((message.type, message.content) for message in model_input)
+    # anything else is never treated as a duplicate
+    return id(model_input)
+
+
+async def iter_chat_completions(
+    model_inputs: List[LanguageModelInput],
+    batch_size: int = 10,
+    temperature: Optional[float] = None,
+    concurrency: int = MAX_CONCURRENT_REQUESTS,
+) -> AsyncIterator[Tuple[int, AIMessage]]:
+    """
+    yield (index of the input, completion) as soon as each completion arrives
+    every input is its own request, at most `concurrency` of them in flight, so a
+    slow completion never holds up others; progress is logged every batch_size
+    completions
+    """
+    # identical inputs are sent once, they would get the same cached answer anyway
+    indexes_by_key: Dict[Hashable, List[int]] = defaultdict(list)
+    for idx, model_input in enumerate(model_inputs):
+        indexes_by_key[_model_input_key(model_input)].append(idx)
+    semaphore = asyncio.Semaphore(concurrency)
+    completed = 0
+
+    async def complete(indexes: List[int]) -> Tuple[List[int], AIMessage]:
+        nonlocal completed
+        async with semaphore:
+            llm_response = await llm.ainvoke(
+                model_inputs[indexes[0]], temperature=temperature
+            )
+        completed += 1
+        if completed % batch_size == 0 or completed == len(indexes_by_key):
+            logger.info(f"completed {completed}/{len(indexes_by_key)} chat completions")
+        return indexes, llm_response
+
+    tasks = [
+        asyncio.ensure_future(complete(indexes)) for indexes in indexes_by_key.values()
+    ]
+    try:
+        for next_completion in asyncio.as_completed(tasks):
+            indexes, llm_response = await next_completion
+            for idx in indexes:
+                yield idx, llm_response
+    finally:
+        # a failed request or a caller that stops early must not leave the rest
+        # running on the shared event loop
+        for task in tasks:
+            task.cancel()
+
+
 async def batch_chat_completion(
     model_inputs: List[LanguageModelInput],
     batch_size: int = 10,
     temperature: Optional[float] = None,
+    concurrency: int = MAX_CONCURRENT_REQUESTS,
 ) -> List[AIMessage]:
     """
-    generate question based on prompt
+    the completions of iter_chat_completions, in input order
     """
-    result: List[AIMessage] = []
-    batch_idx = 0
-    batch_model_input: List[LanguageModelInput] = []
-    for model_input in model_inputs:
-        batch_model_input.append(model_input)
-        if len(batch_model_input) == batch_size:
-            logger.info(f"processing batch {batch_idx}/{len(model_inputs)//batch_size}")
-            llm_response = await llm.abatch(batch_model_input, temperature=temperature)
-            result.extend(llm_response)
-            batch_model_input = []
-            batch_idx += 1
-    if len(batch_model_input) > 0:
-        llm_response = await llm.abatch(batch_model_input)
-        result.extend(llm_response)
-    return result
+    llm_responses: List[AIMessage] = [None] * len(model_inputs)  # type: ignore
+    async for idx, llm_response in iter_chat_completions(
+        model_inputs, batch_size, temperature, concurrency
+    ):
+        llm_responses[idx] = llm_response
+    return llm_responses
 
 
-def generate_questions(
+def _load_generation_progress(
+    progress_path: Path, texts: List[str], backgrounds: List[str]
+) -> Dict[int, Any]:
+    # results of an interrupted run, kept only where the input is unchanged
+    results = {}
+    with open(progress_path, "rb") as f:
+        for line in f:
+            try:
+                record = orjson.loads(line)
+            except orjson.JSONDecodeError:
+                # the last line of a run killed mid write
+                continue
+            idx = record["index"]
+            if (
+                idx < len(texts)
+                and record["text"] == texts[idx]
+                and record["background"] == backgrounds[idx]
+            ):
+                results[idx] = record["questions"]
+    return results
+
+
+async def agenerate_questions(
     prompt: QuestionGenerationPrompt,
     texts: List[str],
     backgrounds: List[str] = [],
     batch_size: int = 10,
+    progress_path: Optional[Path] = None,
 ):
     """
     generate question based on prompt
+    with progress_path, the questions of each text are appended to that jsonl file
+    as soon as they are generated, and texts that already have questions there are
+    not sent again, so an interrupted run resumes where it stopped
     """
-    loop = asyncio.get_event_loop()
-    model_inputs = []
-    for idx, text in enumerate(texts):
-        prompt.text = text
-        old_background = prompt.background
-        if backgrounds:
-            prompt.background = prompt.background + "\n" + backgrounds[idx]
-        model_inputs.append(prompt.to_language_model_input())
-        prompt.background = old_background
-    result = loop.run_until_complete(batch_chat_completion(model_inputs, batch_size))
-    result = list(map(ai_message_to_json, result))
-    for idx, result_item in enumerate(result):
-        if backgrounds:
-            background = prompt.background + "\n" + backgrounds[idx]
-        else:
-            background = prompt.background
-        if type(result_item) == list:
-            for sub_item in result_item:
-                sub_item["text_basis"] = (
-                    "The background of the text use as basis for generating questions is:\n"
-                    + background
-                    + "\n\n"
-                    + "The text use as basis for generating questions is:\n"
-                    + texts[idx]
-                )
-        elif type(result_item) == dict:
-            result_item["text_basis"] = (
+    if backgrounds:
+        backgrounds = [
+            prompt.background + "\n" + background for background in backgrounds
+        ]
+    else:
+        backgrounds = [prompt.background] * len(texts)
+    result: List[Any] = [None] * len(texts)
+    if progress_path is not None and progress_path.exists():
+        for idx, result_item in _load_generation_progress(
+            progress_path, texts, backgrounds
+        ).items():
+            result[idx] = result_item
+    pending = [idx for idx, result_item in enumerate(result) if result_item is None]
+    if len(pending) < len(texts):
+        logger.info(f"resuming with {len(texts) - len(pending)} texts already done")
+    model_inputs = prompt.to_language_model_inputs(
+        [{"text": texts[idx], "background": backgrounds[idx]} for idx in pending]
+    )
+
+    with open(progress_path, "ab") if progress_path else nullcontext() as f:
+        async for pending_idx, llm_response in iter_chat_completions(
+            model_inputs, batch_size
+        ):
+            idx = pending[pending_idx]
+            result_item = ai_message_to_json(llm_response)
+            text_basis = (
                 "The background of the text use as basis for generating questions is:\n"
-                + background
+                + backgrounds[idx]
                 + "\n\n"
                 + "The text use as basis for generating questions is:\n"
                 + texts[idx]
             )
-        else:
-            raise Exception(f"unknown type {type(result_item)}")
+            if type(result_item) == list:
+                for sub_item in result_item:
+                    sub_item["text_basis"] = text_basis
+            elif type(result_item) == dict:
+                result_item["text_basis"] = text_basis
+            else:
+                raise Exception(f"unknown type {type(result_item)}")
+            result[idx] = result_item
+            if f is not None:
+                record = {
+                    "index": idx,
+                    "text": texts[idx],
+                    "background": backgrounds[idx],
+                    "questions": result_item,
+                }
+                f.write(orjson.dumps(record) + b"\n")
+                f.flush()
     return result
 
 
-def evaluate_questions(
+def generate_questions(
+    prompt: QuestionGenerationPrompt,
+    texts: List[str],
+    backgrounds: List[str] = [],
+    batch_size: int = 10,
+    progress_path: Optional[Path] = None,
+):
+    """
+    generate question based on prompt, see agenerate_questions
+    """
+    return run_sync(
+        agenerate_questions(prompt, texts, backgrounds, batch_size, progress_path)
+    )
+
+
+async def aevaluate_questions(
     prompt: QuestionEvaluationPrompt,
     questions_list: List[List[Dict[str, Any]]],
     batch_size: int = 10,
@@ -141,26 +255,40 @@ def evaluate_questions(
     """
     evaluate question based on prompt
     """
-    loop = asyncio.get_event_loop()
     model_inputs = []
 
     for idx, questions in enumerate(questions_list):
-        questions_copy = deepcopy(questions)
-        if type(questions_copy) == dict:
-            questions_copy = [questions_copy]
-            questions_list[idx] = [questions_list[idx]]
-        for question in questions_copy:
-            background = question.pop("text_basis")
-            question_keys = list(question.keys())
-            for key in question_keys:
-                if key not in ["question_description", "choices", "correct_answers"]:
-                    question.pop(key)
+        if type(questions) == dict:
+            questions = questions_list[idx] = [questions]
+        # only the evaluated fields are sent, picked into new dicts instead of
+        # deep copying each question with its long text_basis
+        questions_copy = []
+        for question in questions:
+            background = question["text_basis"]
+            questions_copy.append(
+                {
+                    key: value
+                    for key, value in question.items()
+                    if key in _EVALUATED_QUESTION_KEYS
+                }
+            )
         prompt.background = background
         prompt.questions = json.dumps(questions_copy)
         model_inputs.append(prompt.to_language_model_input())
-    result = loop.run_until_complete(batch_chat_completion(model_inputs, batch_size))
+    result = await batch_chat_completion(model_inputs, batch_size)
     result = list(map(ai_message_to_json, result))
     for idx, result_item in enumerate(result):
         for sub_idx, sub_item in enumerate(result_item):
             sub_item["original_question"] = questions_list[idx][sub_idx]
     return result
+
+
+def evaluate_questions(
+    prompt: QuestionEvaluationPrompt,
+    questions_list: List[List[Dict[str, Any]]],
+    batch_size: int = 10,
+):
+    """
+    evaluate question based on prompt, see aevaluate_questions
+    """
+    return run_sync(aevaluate_questions(prompt, questions_list, batch_size))
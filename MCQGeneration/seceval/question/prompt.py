@@ -1,14 +1,25 @@
 from pydantic import BaseModel, Field
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Set
 import yaml
 from langchain_core.language_models import LanguageModelInput
 from langchain.schema.messages import SystemMessage, HumanMessage, BaseMessage
 import os
+import re
+import string
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+def _template_fields(template: str) -> Set[str]:
+    # names of the keyword fields a str.format template reads, "a" for "{a.b[0]}"
+    return {
+        re.split(r"[.\[]", field_name, maxsplit=1)[0]
+        for _, field_name, _, _ in string.Formatter().parse(template)
+        if field_name
+    }
+
+
 class BasePrompt(BaseModel):
     role: str = Field(description="The role that GPT act as")
     task_description: str = Field(
@@ -18,14 +29,18 @@ class BasePrompt(BaseModel):
     user_prompt_template: str = Field(description="User Prompt Template")
     output_format: str = Field(description="The desired output format of GPT")
 
-    def to_language_model_input(self) -> LanguageModelInput:
-        """
-        serialize prompt to yaml
-        """
+    def _template_values(self) -> Dict[str, Any]:
         prompt_dict = self.model_dump()
         for key in prompt_dict:
             if isinstance(prompt_dict[key], list):
                 prompt_dict[key] = "\n- ".join(prompt_dict[key])
+        return prompt_dict
+
+    def to_language_model_input(self) -> LanguageModelInput:
+        """
+        serialize prompt to yaml
+        """
+        prompt_dict = self._template_values()
         system_prompt_template: str = prompt_dict.pop("system_prompt_template")
         user_prompt_template: str = prompt_dict.pop("user_prompt_template")
 
@@ -39,6 +54,48 @@ class BasePrompt(BaseModel):
 
         return chat_messages
 
+    def to_language_model_inputs(
+        self, field_values: List[Dict[str, str]]
+    ) -> List[LanguageModelInput]:
+        """
+        the inputs to_language_model_input would give with the string fields of each
+        entry of field_values set, without changing the prompt; it is dumped once and
+        a template that uses none of the given fields is formatted once
+        """
+        prompt_dict = self._template_values()
+        system_prompt_template: str = prompt_dict.pop("system_prompt_template")
+        user_prompt_template: str = prompt_dict.pop("user_prompt_template")
+        varying_fields = {key for values in field_values for key in values}
+        system_prompt = None
+        if not varying_fields & _template_fields(system_prompt_template):
+            system_prompt = system_prompt_template.format(**prompt_dict)
+        user_prompt = None
+        if not varying_fields & _template_fields(user_prompt_template):
+            user_prompt = user_prompt_template.format(**prompt_dict)
+
+        inputs: List[LanguageModelInput] = []
+        for values in field_values:
+            values_dict = {**prompt_dict, **values}
+            chat_messages = [
+                SystemMessage(
+                    content=(
+                        system_prompt
+                        if system_prompt is not None
+                        else system_prompt_template.format(**values_dict)
+                    )
+                ),
+                HumanMessage(
+                    content=(
+                        user_prompt
+                        if user_prompt is not None
+                        else user_prompt_template.format(**values_dict)
+                    )
+                ),
+            ]
+            logger.debug(f"chat_messages: {chat_messages}")
+            inputs.append(chat_messages)
+        return inputs
+
 
 class QuestionGenerationPrompt(BasePrompt):
     background: str = Field(
@@ -1,16 +1,32 @@
+from dataclasses import asdict, fields
 from pathlib import Path
 import os
 from seceval.entity import PageItem, TextArtifact, Question
 from seceval.question.prompt import QuestionEvaluationPrompt, QuestionGenerationPrompt
 from typing import List
 from langchain.schema.messages import BaseMessage
+import itertools
 import json
+import orjson
 import yaml
 import logging
 import os
+import sys
 
 logger = logging.getLogger(__name__)
 
+_SHARED_ARTIFACT_FIELDS = ("page_id", "page_uri", "page_type")
+# the html of artifacts and the content and local path of pages are not saved;
+# all other fields are plain values, so no deep copy through asdict is needed
+_SAVED_ARTIFACT_FIELDS = tuple(
+    field.name for field in fields(TextArtifact) if field.name != "html"
+)
+_SAVED_PAGE_FIELDS = tuple(
+    field.name
+    for field in fields(PageItem)
+    if field.name not in ("content", "file_path")
+)
+
 
 def get_dataset_path():
     output_path = Path(__file__).parent.parent / "dataset"
@@ -42,47 +58,50 @@ def get_question_path():
 
 def save_artifacts(task_name, artifacts: List[TextArtifact]):
     output_path = get_data_path()
-    with open(output_path / f"{task_name}.json", "w") as f:
-        artifact_dict = [artifact.model_dump() for artifact in artifacts]
-        for artifact in artifact_dict:
-            artifact.pop("html")
-            pass
-        json.dump(artifact_dict, f, ensure_ascii=False)
+    with open(output_path / f"{task_name}.json", "wb") as f:
+        artifact_dict = [
+            {name: getattr(artifact, name) for name in _SAVED_ARTIFACT_FIELDS}
+            for artifact in artifacts
+        ]
+        f.write(orjson.dumps(artifact_dict))
 
 
 def save_pages(task_name, pages: List[PageItem]):
     output_path = get_data_path()
-    with open(output_path / f"{task_name}_pages.json", "w") as f:
-        page_dict = [page.model_dump() for page in pages]
-        for page in page_dict:
-            page.pop("content")
-            page.pop("file_path")
-        json.dump(page_dict, f, ensure_ascii=False)
+    with open(output_path / f"{task_name}_pages.json", "wb") as f:
+        page_dict = [
+            {name: getattr(page, name) for name in _SAVED_PAGE_FIELDS} for page in pages
+        ]
+        f.write(orjson.dumps(page_dict))
 
 
 def load_artifacts(task_name):
     output_path = get_data_path()
-    with open(output_path / f"{task_name}.json", "r") as f:
-        artifact_dict = json.load(f)
+    with open(output_path / f"{task_name}.json", "rb") as f:
+        artifact_dict = orjson.loads(f.read())
+        for artifact in artifact_dict:
+            # every artifact of a page repeats the page fields, the json
+            # parser gives each its own copy
+            for key in _SHARED_ARTIFACT_FIELDS:
+                if isinstance(artifact.get(key), str):
+                    artifact[key] = sys.intern(artifact[key])
         artifacts = [TextArtifact(**artifact) for artifact in artifact_dict]
         # sort by page_url, level, title, text
-        artifacts = sorted(artifacts, key=lambda x: (x.level, x.title, x.text))
-        # remove duplicate artifacts that has the same page_url, level, title, text
-        for i in range(len(artifacts) - 1, 0, -1):
-            if (
-                artifacts[i].level == artifacts[i - 1].level
-                and artifacts[i].title == artifacts[i - 1].title
-                and artifacts[i].text == artifacts[i - 1].text
-            ):
-                artifacts.pop(i)
+        artifact_key = lambda x: (x.level, x.title, x.text)
+        artifacts = sorted(artifacts, key=artifact_key)
+        # remove duplicate artifacts that has the same page_url, level, title, text;
+        # they are adjacent after sorting, keep the first of each run
+        artifacts = [
+            next(group) for _, group in itertools.groupby(artifacts, key=artifact_key)
+        ]
 
         return artifacts
 
 
 def load_pages(task_name):
     output_path = get_data_path()
-    with open(output_path / f"{task_name}_pages.json", "r") as f:
-        page_dict = json.load(f)
+    with open(output_path / f"{task_name}_pages.json", "rb") as f:
+        page_dict = orjson.loads(f.read())
         pages = [PageItem(**page) for page in page_dict]
         return pages
 
@@ -140,6 +159,13 @@ def save_questions(task_name, questions):
         json.dump(questions, f, ensure_ascii=False, indent=4)
 
 
+def get_questions_progress_path(task_name):
+    """
+    jsonl file generate_questions appends each text's questions to while running
+    """
+    return get_question_path() / f"{task_name}_progress.jsonl"
+
+
 def load_questions(task_name):
     output_path = get_question_path()
     with open(output_path / f"{task_name}.json", "r") as f:
@@ -174,7 +200,7 @@ def save_evaluation_prompt(task_name, prompts: List[List[BaseMessage]]):
 
 def save_dataset(topic_name: str, questions: List[Question], append=False):
     dataset_path = get_dataset_path()
-    questions_dict = [question.model_dump() for question in questions]
+    questions_dict = [asdict(question) for question in questions]
     if append and Path(dataset_path / f"{topic_name}.json").exists():
         with open(dataset_path / f"{topic_name}.json", "r") as f:
             questions_dict = json.load(f) + questions_dict
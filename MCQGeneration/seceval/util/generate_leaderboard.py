@@ -1,31 +1,38 @@
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+import functools
 import glob
 import json
+import orjson
 import re
 from typing import Dict, List, Any
 
+_UPPER_CASE_RE = re.compile(r"([A-Z])")
+
 
 # add space if you encounter upper case unless it is the first letter
+# the same topic names come up in every result file, so the results are cached
+@functools.lru_cache(maxsize=None)
 def add_space(text):
     if text == "PenTest":
         return "PenTest"
-    text = re.sub(r"([A-Z])", r" \1", text)
+    text = _UPPER_CASE_RE.sub(r" \1", text)
     return text.lstrip()
 
 
 def count_score_by_topic(
     dataset: List[Dict[str, Any]], pending_to_remove: List[Dict[str, Any]] = []
 ):
-    score_by_topic = {}
-    total_score_by_topic = {}
+    score_by_topic = defaultdict(int)
+    total_score_by_topic = defaultdict(int)
     score = 0
+    # the rows to remove are taken from dataset itself, match them by identity
+    pending_ids = {id(dataset_row) for dataset_row in pending_to_remove}
     for dataset_row in dataset:
-        if dataset_row in pending_to_remove:
+        if id(dataset_row) in pending_ids:
             continue
         for topic in dataset_row["topics"]:
-            if topic not in score_by_topic:
-                score_by_topic[topic] = 0
-                total_score_by_topic[topic] = 0
             score_by_topic[topic] += dataset_row["score"]
             total_score_by_topic[topic] += 1
         score += dataset_row["score"]
@@ -43,10 +50,18 @@ def count_score_by_topic(
     return score_float, score_fraction
 
 
+def load_eval_result(eval_result_file):
+    with open(eval_result_file, "rb") as f:
+        return orjson.loads(f.read())
+
+
 result_path = Path(__file__).parent.parent.parent / "result"
 all_result_files = glob.glob(str(result_path) + "/all_*.json")
+# reading and parsing the result files is independent, do it in parallel
+with ThreadPoolExecutor(max_workers=8) as executor:
+    eval_results = list(executor.map(load_eval_result, all_result_files))
 leaderboards = []
-for eval_result_file in all_result_files:
+for eval_result_file, eval_result in zip(all_result_files, eval_results):
     leaderboard = {}
     model_name = Path(eval_result_file).stem.split("_")[2]
     creator = Path(eval_result_file).stem.split("_")[1]
@@ -57,29 +72,25 @@ for eval_result_file in all_result_files:
     else:
         leaderboard["Access"] = "Weight"
     leaderboard["Submission Date"] = "2023-12-20"
-    with open(eval_result_file, "r") as f:
-        eval_result = json.load(f)
-        pending_to_remove = list(
-            filter(lambda x: x["flags"].get("calibrated_answer"), eval_result["detail"])
-        )
-        pending_to_remove += list(
-            filter(lambda x: x["flags"].get("invalid") != None, eval_result["detail"])
-        )
-        score_float, score_fraction = count_score_by_topic(
-            eval_result["detail"], pending_to_remove
-        )
-        eval_result["score_float"] = score_float
-        eval_result["score_fraction"] = score_fraction
-        print(eval_result["score_fraction"])
-        for topic in eval_result["score_float"]:
-            leaderboard[add_space(topic)] = format(
-                eval_result["score_float"][topic], ".2f"
-            )
-        leaderboards.append(leaderboard)
+    pending_to_remove = [
+        x for x in eval_result["detail"] if x["flags"].get("calibrated_answer")
+    ]
+    pending_to_remove += [
+        x for x in eval_result["detail"] if x["flags"].get("invalid") != None
+    ]
+    score_float, score_fraction = count_score_by_topic(
+        eval_result["detail"], pending_to_remove
+    )
+    eval_result["score_float"] = score_float
+    eval_result["score_fraction"] = score_fraction
+    print(eval_result["score_fraction"])
+    for topic in eval_result["score_float"]:
+        leaderboard[add_space(topic)] = format(eval_result["score_float"][topic], ".2f")
+    leaderboards.append(leaderboard)
 
-    leaderboards = sorted(leaderboards, key=lambda x: float(x["Overall"]), reverse=True)
-    for i in range(len(leaderboards)):
-        leaderboards[i]["#"] = str(i + 1)
+leaderboards = sorted(leaderboards, key=lambda x: float(x["Overall"]), reverse=True)
+for i in range(len(leaderboards)):
+    leaderboards[i]["#"] = str(i + 1)
 
 with open(result_path / "leaderboard.json", "w") as f:
     json.dump(leaderboards, f, ensure_ascii=False, indent=4)
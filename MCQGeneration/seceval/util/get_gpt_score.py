@@ -1,3 +1,4 @@
+from collections import defaultdict
 from pathlib import Path
 import glob
 import json
@@ -9,14 +10,11 @@ leaderboards = []
 
 
 def count_score_by_topic(dataset: List[Dict[str, Any]]):
-    score_by_topic = {}
-    total_score_by_topic = {}
+    score_by_topic = defaultdict(int)
+    total_score_by_topic = defaultdict(int)
     score = 0
     for dataset_row in dataset:
         for topic in dataset_row["topics"]:
-            if topic not in score_by_topic:
-                score_by_topic[topic] = 0
-                total_score_by_topic[topic] = 0
             score_by_topic[topic] += dataset_row["score"]
             total_score_by_topic[topic] += 1
         score += dataset_row["score"]